@@ -1,4 +1,4 @@
-import type { KVStore, SqliteRow } from "../db"
+import type { KVStore, SqliteRow, SqliteValue } from "../db"
 import { SIDE_TABLE_THRESHOLD_BYTES } from "../db"
 import type { Run } from "@shared/types/Run"
 import type { RunResult } from "@shared/types/RunResult"
@@ -39,6 +39,9 @@ export type BodyStorage = "inline" | "side"
 
 const TERMINAL_STATUSES: ReadonlySet<Run["status"]> = new Set(["completed", "failed", "cancelled", "interrupted"])
 
+/** Node-status pairs per `json_set` call; stays under SQLite's default function-argument cap. */
+const NODE_STATUS_BATCH_SIZE = 50
+
 const COLUMNS =
   "id, workspace_id, workflow_id, status, node_statuses_json, extracted_variables_json, response_metadata_json, startedAt, completedAt, rev, createdAt, updatedAt"
 
@@ -57,6 +60,14 @@ interface RunRow extends SqliteRow {
   readonly updatedAt: string
 }
 
+/** Just the columns a status transition reads; see {@link RunRepository.setStatus}. */
+interface RunTimingRow extends SqliteRow {
+  readonly startedAt: string | null
+  readonly completedAt: string | null
+  readonly duration: SqliteValue
+  readonly error: SqliteValue
+}
+
 /** Everything on a Run that has no dedicated column rides in this blob. */
 interface RunMetadata {
   readonly selectedEnvironmentId: string | null
@@ -171,29 +182,46 @@ export class RunRepository {
   /**
    * Port of `RunRepository.update_status`: stamps `startedAt` on first
    * transition to running and `completedAt`/`duration` on any terminal state.
+   * Returns the updated run; callers that do not need it use {@link setStatus}.
+   */
+  public updateStatus(runId: string, status: Run["status"], error?: string): Run | undefined {
+    return this.setStatus(runId, status, error) ? this.getById(runId) : undefined
+  }
+
+  /**
+   * {@link updateStatus} without reading the run back: returns false when the
+   * run does not exist. The scheduler's transitions go through here.
    *
    * Field-level write (decision #6b): touches only the status/timestamp columns
    * and patches `duration`/`error` into the metadata blob — it never rewrites
    * `node_statuses_json`/`extracted_variables_json`, so per-node progress patched
    * by {@link appendNodeStatus} is never clobbered by a status transition.
    */
-  public updateStatus(runId: string, status: Run["status"], error?: string): Run | undefined {
-    const existing = this.getById(runId)
-    if (existing === undefined) {
-      return undefined
+  public setStatus(runId: string, status: Run["status"], error?: string): boolean {
+    // Read only the timing fields: a terminal transition lands after the results
+    // are written, and decoding the whole row here would validate all of them.
+    const row = this.store.get<RunTimingRow>(
+      "SELECT startedAt, completedAt, json_extract(response_metadata_json, '$.duration') AS duration, " +
+        "json_extract(response_metadata_json, '$.error') AS error FROM runs WHERE id = ?",
+      [runId],
+    )
+    if (row === undefined) {
+      return false
     }
-    const now = new Date().toISOString()
-    const startedAt = status === "running" && existing.startedAt == null ? now : existing.startedAt ?? null
+    const nowMs = Date.now()
+    const now = new Date(nowMs).toISOString()
+    const startedAt = status === "running" && row.startedAt == null ? now : row.startedAt
     const terminal = TERMINAL_STATUSES.has(status)
-    const completedAt = terminal ? now : existing.completedAt ?? null
-    const duration =
-      terminal && startedAt != null ? Date.parse(completedAt ?? now) - Date.parse(startedAt) : existing.duration ?? null
+    const completedAt = terminal ? now : row.completedAt
+    const previousDuration = typeof row.duration === "number" ? row.duration : null
+    const duration = terminal && startedAt != null ? nowMs - Date.parse(startedAt) : previousDuration
+    const previousError = typeof row.error === "string" ? row.error : null
     this.store.set(
       "UPDATE runs SET status = ?, startedAt = ?, completedAt = ?, " +
         "response_metadata_json = json_set(response_metadata_json, '$.duration', ?, '$.error', ?) WHERE id = ?",
-      [status, startedAt, completedAt, duration, error ?? existing.error ?? null, runId],
+      [status, startedAt, completedAt, duration, error ?? previousError, runId],
     )
-    return this.getById(runId)
+    return true
   }
 
   /**
@@ -210,6 +238,29 @@ export class RunRepository {
     ])
   }
 
+  /**
+   * Batched {@link appendNodeStatus}: patches every entry into `node_statuses_json`
+   * with one multi-path `json_set` per {@link NODE_STATUS_BATCH_SIZE} entries, all
+   * inside a single transaction. Used by the scheduler's write-behind status buffer.
+   */
+  public appendNodeStatuses(runId: string, entries: ReadonlyMap<string, JsonValue>): void {
+    const pairs = [...entries]
+    this.store.transaction((store) => {
+      for (let start = 0; start < pairs.length; start += NODE_STATUS_BATCH_SIZE) {
+        const batch = pairs.slice(start, start + NODE_STATUS_BATCH_SIZE)
+        const params: string[] = []
+        for (const [nodeId, entry] of batch) {
+          params.push(`$.${JSON.stringify(nodeId)}`, toJson(entry))
+        }
+        const paths = batch.map(() => ", ?, json(?)").join("")
+        store.set(`UPDATE runs SET node_statuses_json = json_set(node_statuses_json${paths}) WHERE id = ?`, [
+          ...params,
+          runId,
+        ])
+      }
+    })
+  }
+
   /**
    * Merge extracted variables into `extracted_variables_json` via `json_patch`
    * (RFC 7386 object merge) — targeted column write, whole row untouched.
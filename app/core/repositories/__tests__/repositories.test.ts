@@ -175,6 +175,15 @@ describe("RunRepository", () => {
     expect(done?.duration).toBeGreaterThanOrEqual(0)
   })
 
+  it("setStatus writes the transition without reading the run back", () => {
+    const { runId } = seedRun()
+    expect(runs.setStatus(runId, "running")).toBe(true)
+    expect(runs.setStatus("missing-run", "running")).toBe(false)
+    const run = runs.getById(runId)
+    expect(run?.status).toBe("running")
+    expect(run?.startedAt).toEqual(expect.any(String))
+  })
+
   it("spills a large node body to the side table and cascades on delete (QA: side-table-cascade)", () => {
     const { runId } = seedRun()
     const body = Buffer.alloc(2 * 1024 * 1024, "x")
@@ -205,6 +214,21 @@ describe("RunRepository", () => {
     expect(runs.getNodeBody(runId, "http-1")).toBeUndefined()
   })
 
+  it("patches a batch of node statuses beside existing entries in one call", () => {
+    const { runId } = seedRun()
+    runs.appendNodeStatus(runId, "start", { status: "passed" })
+
+    const entries = new Map<string, { status: string }>([["start", { status: "running" }]])
+    for (let i = 0; i < 120; i++) entries.set(`node.${i}`, { status: "passed" })
+    entries.set("start", { status: "passed" })
+    runs.appendNodeStatuses(runId, entries)
+
+    const statuses = runs.getById(runId)?.nodeStatuses ?? {}
+    expect(Object.keys(statuses)).toHaveLength(121)
+    expect(statuses["start"]).toEqual({ status: "passed" })
+    expect(statuses["node.119"]).toEqual({ status: "passed" })
+  })
+
   it("lists by workflow and finds the latest failed run", () => {
     const { workflowId } = seedRun()
     const workspaceId = workflows.getById(workflowId)!.workspaceId
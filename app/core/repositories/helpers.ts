@@ -83,6 +83,9 @@ function isCanonicalKvArray(v: unknown): boolean {
   return Array.isArray(v) && v.every(isCanonicalPair)
 }
 
+/** Whichever of `=` / `:` comes first in a line splits key from value. */
+const KV_SEPARATOR = /[=:]/
+
 /** Split a `"key=value"` / `"key:value"` / multiline string into pairs.
  * Keeps insert order; drops blank lines and entries with no separator. */
 function stringToPairs(text: string): readonly KeyValuePair[] {
@@ -90,11 +93,7 @@ function stringToPairs(text: string): readonly KeyValuePair[] {
   for (const rawLine of text.split(/\r?\n/)) {
     const line = rawLine.trim()
     if (!line) continue
-    const eq = line.indexOf("=")
-    const colon = line.indexOf(":")
-    let sep = -1
-    if (eq >= 0 && (colon < 0 || eq < colon)) sep = eq
-    else if (colon >= 0) sep = colon
+    const sep = line.search(KV_SEPARATOR)
     if (sep < 0) {
       pairs.push({ key: line, value: "" })
       continue
@@ -165,7 +165,7 @@ describe("WorkflowExecutor", () => {
       const executor = new WorkflowExecutor(makeDeps())
       ;(executor as unknown as { results: Map<string, unknown> }).results.set("prev_node", {
         type: "http-request",
-        headers: { "set-cookie": "session=abc; Path=/; HttpOnly, theme=dark; Path=/" },
+        cookies: { session: "abc", theme: "dark" },
       })
       const output = await executor.executeWorkflow(workflow)
       expect(output.nodeStatuses["assert1"]).toBe("passed")
@@ -560,10 +560,9 @@ describe("WorkflowExecutor", () => {
             evaluateMergeConditions: (
               c: Record<string, unknown>,
               p: readonly string[],
-              e: readonly unknown[],
             ) => void
           }
-        ).evaluateMergeConditions({ conditions, conditionLogic }, predIds, [])
+        ).evaluateMergeConditions({ conditions, conditionLogic }, predIds)
     }
 
     it("passes when a branch field matches (OR)", () => {
@@ -654,6 +653,86 @@ describe("WorkflowExecutor", () => {
     })
   })
 
+  describe("merge waiting", () => {
+    /** start → fast, start → slow, both → merge ("all") → tail. */
+    const fanIn = (slowMs: number): WorkflowGraph => ({
+      nodes: [
+        { nodeId: "start", type: "start" },
+        { nodeId: "fast", type: "delay", config: { duration: 1 } },
+        { nodeId: "slow", type: "delay", config: { duration: slowMs } },
+        { nodeId: "merge", type: "merge", config: { mergeStrategy: "all" } },
+        { nodeId: "tail", type: "delay", config: { duration: 1 } },
+      ],
+      edges: [
+        { edgeId: "e1", source: "start", target: "fast" },
+        { edgeId: "e2", source: "start", target: "slow" },
+        { edgeId: "e3", source: "fast", target: "merge" },
+        { edgeId: "e4", source: "slow", target: "merge" },
+        { edgeId: "e5", source: "merge", target: "tail" },
+      ],
+    })
+
+    it("joins once the slower predecessor settles", async () => {
+      const executor = new WorkflowExecutor(makeDeps())
+      const output = await executor.executeWorkflow(fanIn(30))
+      expect(output.status).toBe("passed")
+      expect(output.nodeStatuses["merge"]).toBe("passed")
+      expect(output.nodeStatuses["tail"]).toBe("passed")
+    })
+
+    it("runs the merge and its downstream once for all arriving branches", async () => {
+      const started: string[] = []
+      const executor = new WorkflowExecutor({
+        ...makeDeps(),
+        emitProgress: (event) => {
+          if (event.kind === "node.status" && event.status === "running") {
+            started.push(event.nodeId)
+          }
+        },
+      })
+      const output = await executor.executeWorkflow(fanIn(5))
+      expect(started.filter((id) => id === "merge" || id === "tail")).toEqual(["merge", "tail"])
+      expect(output.nodeStatuses["merge"]).toBe("passed")
+    })
+
+    it("stops waiting when the run is cancelled, even for branches that never start", async () => {
+      // start → a → merge, start → b → c → merge. Cancelling while b delays
+      // means c is never executed, so only the cancel can end the merge's wait.
+      const workflow: WorkflowGraph = {
+        nodes: [
+          { nodeId: "start", type: "start" },
+          { nodeId: "a", type: "delay", config: { duration: 1 } },
+          { nodeId: "b", type: "delay", config: { duration: 200 } },
+          { nodeId: "c", type: "delay", config: { duration: 1 } },
+          { nodeId: "merge", type: "merge", config: { mergeStrategy: "all" } },
+        ],
+        edges: [
+          { edgeId: "e1", source: "start", target: "a" },
+          { edgeId: "e2", source: "start", target: "b" },
+          { edgeId: "e3", source: "b", target: "c" },
+          { edgeId: "e4", source: "a", target: "merge" },
+          { edgeId: "e5", source: "c", target: "merge" },
+        ],
+      }
+      const controller = new AbortController()
+      const executor = new WorkflowExecutor(makeDeps())
+      setTimeout(() => controller.abort(), 20)
+      const startedAt = Date.now()
+      const output = await executor.executeWorkflow(workflow, { cancelSignal: controller.signal })
+      expect(Date.now() - startedAt).toBeLessThan(1000)
+      expect(output.nodeStatuses["c"]).toBeUndefined()
+      expect(output.nodeStatuses["merge"]).toBe("failed")
+    })
+
+    it("fails the merge when a predecessor outlasts mergeTimeoutMs", async () => {
+      const executor = new WorkflowExecutor({ ...makeDeps(), mergeTimeoutMs: 10 })
+      const output = await executor.executeWorkflow(fanIn(200))
+      expect(output.status).toBe("failed")
+      expect(output.failedNodes).toContain("merge")
+      expect(output.failureMessage).toBe("Node merge failed")
+    })
+  })
+
   /**
    * Traversal walks every edge, so before this a node that two paths converged
    * on was executed once per path. For an http-request node that is a request
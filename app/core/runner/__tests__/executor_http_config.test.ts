@@ -1,3 +1,6 @@
+import fs from "node:fs"
+import os from "node:os"
+import path from "node:path"
 import { describe, expect, it } from "vitest"
 import type { RequestInit as UndiciRequestInit } from "undici"
 import { WorkflowExecutor, type WorkflowGraph } from "../executor"
@@ -67,7 +70,7 @@ describe("WorkflowExecutor — HTTP request config panel contract", () => {
     await executor.executeWorkflow(
       singleHttpNodeWorkflow({
         method: "GET",
-        url: "http://localhost/users/{userId}/posts/{postId}",
+        url: "http://localhost/users/{userId}/posts/{postId}?author={userId}&tag={unused}",
         pathVariables: [
           { key: "userId", value: "42", active: true },
           { key: "postId", value: "7", active: true },
@@ -75,7 +78,122 @@ describe("WorkflowExecutor — HTTP request config panel contract", () => {
         ],
       }),
     )
-    expect(captured[0]!.url).toBe("http://localhost/users/42/posts/7")
+    expect(captured[0]!.url).toBe("http://localhost/users/42/posts/7?author=42&tag={unused}")
+  })
+
+  it("resolves {{prev.*}} and {{prev[i].*}} against earlier results", async () => {
+    const { executor, captured } = makeExecutorWithCapture(() => new Response('{"id":7}', { status: 200 }))
+    await executor.executeWorkflow({
+      nodes: [
+        { nodeId: "start", type: "start" },
+        { nodeId: "http_1", type: "http-request", config: { method: "GET", url: "http://localhost/items" } },
+        {
+          nodeId: "http_2",
+          type: "http-request",
+          config: { method: "GET", url: "http://localhost/items/{{prev.body.id}}?first={{prev[0].body.id}}&none={{prev[5].body.id}}" },
+        },
+      ],
+      edges: [
+        { edgeId: "e1", source: "start", target: "http_1" },
+        { edgeId: "e2", source: "http_1", target: "http_2" },
+      ],
+    })
+    expect(captured[1]!.url).toBe("http://localhost/items/7?first=7&none={{prev[5].body.id}}")
+  })
+
+  it("resolves nested {{env.*}} and {{variables.*}} paths and leaves misses as written", async () => {
+    const captured: CapturedRequest[] = []
+    const clock = new FixedClockProvider("2026-01-02T03:04:05.000Z")
+    const rng = new SeededRandomProvider("0xDEADBEEF")
+    const fetchImpl = async (url: string, init: UndiciRequestInit): Promise<Response> => {
+      captured.push({ url, init })
+      return new Response("{}", { status: 200 })
+    }
+    const http = new SafeHttp({ allowLoopback: true, fetchImpl: fetchImpl as never })
+    const functions = new DynamicFunctions(clock, rng)
+    const executor = new WorkflowExecutor({
+      clock,
+      rng,
+      http,
+      functions,
+      environmentVariables: { api: { host: "localhost" } },
+    })
+    await executor.executeWorkflow({
+      ...singleHttpNodeWorkflow({
+        method: "GET",
+        url: "http://{{env.api.host}}/users/{{variables.user.id}}?x={{variables.user.none}}&y={{env.missing}}",
+      }),
+      variables: { user: { id: 42 } },
+    })
+    expect(captured[0]!.url).toBe("http://localhost/users/42?x={{variables.user.none}}&y={{env.missing}}")
+  })
+
+  it("resolves repeated placeholders consistently and calls functions per occurrence", async () => {
+    const { executor, captured } = makeExecutorWithCapture(() => new Response("{}", { status: 200 }))
+    await executor.executeWorkflow({
+      ...singleHttpNodeWorkflow({
+        method: "GET",
+        url: "http://localhost/{{variables.id}}/{{variables.id}}?a={{uuid()}}&b={{uuid()}}",
+      }),
+      variables: { id: 7 },
+    })
+    const url = new URL(captured[0]!.url)
+    expect(url.pathname).toBe("/7/7")
+    expect(url.searchParams.get("a")).not.toBe(url.searchParams.get("b"))
+  })
+
+  it("passes a quoted function argument containing commas as one argument", async () => {
+    const { executor, captured } = makeExecutorWithCapture(() => new Response("{}", { status: 200 }))
+    await executor.executeWorkflow(
+      singleHttpNodeWorkflow({ method: "GET", url: 'http://localhost/resource?pick={{randomChoice(",z")}}' }),
+    )
+    expect(captured[0]!.url).toBe("http://localhost/resource?pick=z")
+  })
+
+  it("reads a merge branch from the nearest HTTP ancestor even after an earlier merge looked early", async () => {
+    const clock = new FixedClockProvider("2026-01-02T03:04:05.000Z")
+    const rng = new SeededRandomProvider("0xDEADBEEF")
+    const fetchImpl = async (url: string): Promise<Response> => {
+      if (url.endsWith("/p")) {
+        await new Promise((resolve) => setTimeout(resolve, 40))
+        return new Response('{"who":"p"}', { status: 200 })
+      }
+      return new Response('{"who":"q"}', { status: 200 })
+    }
+    const http = new SafeHttp({ allowLoopback: true, fetchImpl: fetchImpl as never })
+    const functions = new DynamicFunctions(clock, rng)
+    const executor = new WorkflowExecutor({ clock, rng, http, functions })
+    // m1 ("first") runs off x while p is still in flight, so it walks d's
+    // chain past p to q. m2 runs once d settles and must see p's response.
+    const output = await executor.executeWorkflow({
+      nodes: [
+        { nodeId: "start", type: "start" },
+        { nodeId: "x", type: "delay", config: { duration: 10 } },
+        { nodeId: "q", type: "http-request", config: { method: "GET", url: "http://localhost/q" } },
+        { nodeId: "p", type: "http-request", config: { method: "GET", url: "http://localhost/p" } },
+        { nodeId: "d", type: "delay", config: { duration: 1 } },
+        { nodeId: "m1", type: "merge", config: { mergeStrategy: "first" } },
+        {
+          nodeId: "m2",
+          type: "merge",
+          config: {
+            mergeStrategy: "conditional",
+            conditions: [{ branchIndex: 0, field: "body.who", operator: "equals", value: "p" }],
+          },
+        },
+      ],
+      edges: [
+        { edgeId: "e1", source: "start", target: "x" },
+        { edgeId: "e2", source: "start", target: "q" },
+        { edgeId: "e3", source: "q", target: "p" },
+        { edgeId: "e4", source: "p", target: "d" },
+        { edgeId: "e5", source: "x", target: "m1" },
+        { edgeId: "e6", source: "d", target: "m1" },
+        { edgeId: "e7", source: "d", target: "m2" },
+      ],
+    })
+    expect(output.nodeStatuses["m1"]).toBe("passed")
+    expect(output.nodeStatuses["m2"]).toBe("passed")
   })
 
   it("builds an Authorization header for bearer auth", async () => {
@@ -132,6 +250,75 @@ describe("WorkflowExecutor — HTTP request config panel contract", () => {
     expect(headers["Cookie"]).toBe("session=abc")
   })
 
+  it("keeps every Set-Cookie line and reads cookies by name, not by attribute", async () => {
+    const { executor } = makeExecutorWithCapture(() => {
+      const headers = new Headers()
+      headers.append("set-cookie", "session=abc; Path=/; Expires=Wed, 21 Oct 2015 07:28:00 GMT")
+      headers.append("set-cookie", "theme=dark; HttpOnly")
+      return new Response("{}", { status: 200, headers })
+    })
+    const output = await executor.executeWorkflow({
+      nodes: [
+        { nodeId: "start", type: "start" },
+        { nodeId: "http_1", type: "http-request", config: { method: "GET", url: "http://localhost/resource" } },
+        {
+          nodeId: "assert1",
+          type: "assertion",
+          config: {
+            assertions: [
+              { source: "cookies", path: "session", operator: "equals", expectedValue: "abc" },
+              { source: "cookies", path: "theme", operator: "equals", expectedValue: "dark" },
+              { source: "cookies", path: "Path", operator: "notExists" },
+            ],
+            failureMode: "all",
+          },
+        },
+      ],
+      edges: [
+        { edgeId: "e1", source: "start", target: "http_1" },
+        { edgeId: "e2", source: "http_1", target: "assert1" },
+      ],
+    })
+    expect(output.nodeStatuses["assert1"]).toBe("passed")
+    const response = output.results[0]!.response as { headers: Record<string, string> }
+    expect(response.headers["set-cookie"]).toBe(
+      "session=abc; Path=/; Expires=Wed, 21 Oct 2015 07:28:00 GMT, theme=dark; HttpOnly",
+    )
+  })
+
+  it("resolves {{prev.cookies.*}} from the previous response's Set-Cookie lines", async () => {
+    const { executor, captured } = makeExecutorWithCapture(() => {
+      const headers = new Headers()
+      headers.append("set-cookie", "session=abc; Path=/")
+      return new Response("{}", { status: 200, headers })
+    })
+    await executor.executeWorkflow({
+      nodes: [
+        { nodeId: "start", type: "start" },
+        { nodeId: "http_1", type: "http-request", config: { method: "GET", url: "http://localhost/login" } },
+        { nodeId: "http_2", type: "http-request", config: { method: "GET", url: "http://localhost/me?s={{prev.cookies.session}}" } },
+      ],
+      edges: [
+        { edgeId: "e1", source: "start", target: "http_1" },
+        { edgeId: "e2", source: "http_1", target: "http_2" },
+      ],
+    })
+    expect(captured[1]!.url).toBe("http://localhost/me?s=abc")
+  })
+
+  it("parses JSON response bodies and keeps anything else as text", async () => {
+    const bodies = ["<html>ok</html>", "  [1, 2]", "{not json"]
+    const { executor } = makeExecutorWithCapture(() => new Response(bodies.shift(), { status: 200 }))
+    const parsed: unknown[] = []
+    for (let i = 0; i < 3; i++) {
+      const output = await executor.executeWorkflow(
+        singleHttpNodeWorkflow({ method: "GET", url: "http://localhost/resource" }),
+      )
+      parsed.push((output.results[0]!.response as { body: unknown }).body)
+    }
+    expect(parsed).toEqual(["<html>ok</html>", [1, 2], "{not json"])
+  })
+
   it("builds an x-www-form-urlencoded body from urlEncodedEntries", async () => {
     const { executor, captured } = makeExecutorWithCapture(() => new Response("{}", { status: 200 }))
     await executor.executeWorkflow(
@@ -161,6 +348,71 @@ describe("WorkflowExecutor — HTTP request config panel contract", () => {
     expect(form.get("name")).toBe("apiweave")
   })
 
+  it("attaches form-data file rows from disk under their file name", async () => {
+    const dir = fs.mkdtempSync(path.join(os.tmpdir(), "aw-test-"))
+    const filePath = path.join(dir, "upload.txt")
+    fs.writeFileSync(filePath, "file body")
+    try {
+      const { executor, captured } = makeExecutorWithCapture(() => new Response("{}", { status: 200 }))
+      await executor.executeWorkflow(
+        singleHttpNodeWorkflow({
+          method: "POST",
+          url: "http://localhost/resource",
+          bodyType: "form-data",
+          formDataEntries: [{ key: "doc", value: filePath, type: "file", active: true }],
+        }),
+      )
+      const form = captured[0]!.init.body as unknown as { get(name: string): File }
+      const file = form.get("doc")
+      expect(file.name).toBe("upload.txt")
+      expect(await file.text()).toBe("file body")
+    } finally {
+      fs.rmSync(dir, { recursive: true, force: true })
+    }
+  })
+
+  it("fails the body build with the path when a form-data file row is missing or a directory", async () => {
+    const dir = fs.mkdtempSync(path.join(os.tmpdir(), "aw-test-"))
+    const missing = path.join(dir, "missing.txt")
+    try {
+      const errors: unknown[] = []
+      for (const value of [missing, dir]) {
+        const { executor, captured } = makeExecutorWithCapture(() => new Response("{}", { status: 200 }))
+        const output = await executor.executeWorkflow(
+          singleHttpNodeWorkflow({
+            method: "POST",
+            url: "http://localhost/resource",
+            bodyType: "form-data",
+            formDataEntries: [{ key: "doc", value, type: "file", active: true }],
+          }),
+        )
+        expect(captured).toHaveLength(0)
+        errors.push(output.results[0]!.error)
+      }
+      expect(errors[0]).toContain("Failed to build request body")
+      expect(errors[0]).toContain("ENOENT")
+      expect(errors[0]).toContain(missing)
+      expect(errors[1]).toContain(`Not a regular file: '${dir}'`)
+    } finally {
+      fs.rmSync(dir, { recursive: true, force: true })
+    }
+  })
+
+  it("decodes a data-URL binary upload without its header", async () => {
+    const { executor, captured } = makeExecutorWithCapture(() => new Response("{}", { status: 200 }))
+    await executor.executeWorkflow(
+      singleHttpNodeWorkflow({
+        method: "POST",
+        url: "http://localhost/resource",
+        bodyType: "binary",
+        fileUploads: [{ type: "base64", value: "data:text/plain;base64,aGVsbG8=", mimeType: "text/plain" }],
+      }),
+    )
+    const { init } = captured[0]!
+    expect((init.body as Buffer).toString("utf-8")).toBe("hello")
+    expect((init.headers as Record<string, string>)["Content-Type"]).toBe("text/plain")
+  })
+
   it("does not follow redirects when followRedirects=false", async () => {
     let calls = 0
     const clock = new FixedClockProvider("2026-01-02T03:04:05.000Z")
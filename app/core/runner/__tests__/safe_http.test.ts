@@ -177,6 +177,25 @@ describe("SafeHttp.safeFetch (no real network)", () => {
     expect(capturedInit!.dispatcher).toBeDefined()
   })
 
+  it("reuses one pinned dispatcher per resolved IP so connections can be kept alive", async () => {
+    const dispatchers: unknown[] = []
+    const fetchImpl = async (_url: string, init: RequestInit): Promise<Response> => {
+      dispatchers.push(init.dispatcher)
+      return new Response("ok", { status: 200 })
+    }
+    const dnsLookup = async (host: string): Promise<LookupAddress[]> => [
+      { address: host === "example.org" ? "93.184.216.35" : "93.184.216.34", family: 4 },
+    ]
+    const http = new SafeHttp({ allowLoopback: true, fetchImpl: fetchImpl as never, dnsLookup })
+    await http.safeFetch("https://example.com/a")
+    await http.safeFetch("https://example.com/b")
+    await http.safeFetch("https://example.org/")
+    await http.safeFetch("https://example.com/c", {}, { rejectUnauthorized: false })
+    expect(dispatchers[1]).toBe(dispatchers[0])
+    expect(dispatchers[2]).not.toBe(dispatchers[0])
+    expect(dispatchers[3]).not.toBe(dispatchers[0])
+  })
+
   it("redirect to blocked target is refused mid-chain", async () => {
     let calls = 0
     const fetchImpl = async (): Promise<Response> => {
@@ -239,3 +258,28 @@ describe("SafeHttp.safeFetch (no real network)", () => {
     expect(http.isSafeUrl("https://api.gitlab.com/users/octocat")).toBe(false)
   })
 })
+
+describe("SafeHttp.readTextCapped", () => {
+  const streamed = (chunks: readonly Uint8Array[]): Response =>
+    new Response(
+      new ReadableStream<Uint8Array>({
+        start(controller) {
+          for (const chunk of chunks) controller.enqueue(chunk)
+          controller.close()
+        },
+      }),
+    )
+
+  it("decodes a multi-byte character split across chunks", async () => {
+    const bytes = new TextEncoder().encode("{\"name\":\"café\"}")
+    const split = bytes.indexOf(0xc3) + 1
+    const result = await allowLoopback.readTextCapped(streamed([bytes.subarray(0, split), bytes.subarray(split)]), 1024)
+    expect(result).toEqual({ text: "{\"name\":\"café\"}", truncated: false })
+  })
+
+  it("stops at the byte cap and reports truncation", async () => {
+    const chunk = new TextEncoder().encode("abcdef")
+    const result = await allowLoopback.readTextCapped(streamed([chunk, chunk]), 8)
+    expect(result).toEqual({ text: "abcdefab", truncated: true })
+  })
+})
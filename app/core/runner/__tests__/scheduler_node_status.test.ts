@@ -0,0 +1,208 @@
+import { describe, expect, it } from "vitest"
+import type { RequestInit as UndiciRequestInit } from "undici"
+import type { RunRepository, WorkflowRepository } from "../../repositories"
+import { RunScheduler } from "../scheduler"
+import { DynamicFunctions } from "../dynamic_functions"
+import { SafeHttp } from "../safe_http"
+import { FixedClockProvider, SeededRandomProvider } from "../harness/providers"
+import type { RunEvent } from "@shared/types/RunProgressEvent"
+import type { JsonValue } from "@shared/types/JsonValue"
+
+/**
+ * The scheduler's write-behind node-status buffer, against an in-memory stand-in
+ * for RunRepository that records every appendNodeStatuses batch. The DB-backed
+ * scheduler tests sleep long enough that any flush at all looks correct; these
+ * pin down when batches are written and what is in them.
+ */
+
+interface GraphNode {
+  readonly nodeId: string
+  readonly type: string
+  readonly config?: Record<string, unknown>
+}
+
+interface GraphEdge {
+  readonly edgeId: string
+  readonly source: string
+  readonly target: string
+}
+
+class RecordingRunStore {
+  /** Every successful appendNodeStatuses call, in order. */
+  readonly writes: Array<ReadonlyMap<string, JsonValue>> = []
+  readonly nodeStatuses: Record<string, JsonValue> = {}
+  failedWrites = 0
+  status = "pending"
+
+  public constructor(private failuresLeft = 0) {}
+
+  create() {
+    return { runId: "run-1" }
+  }
+
+  getById(runId: string) {
+    return { runId, workflowId: "wf-1", workspaceId: "ws-1", variables: {}, results: [], failedNodes: [] }
+  }
+
+  setStatus(_runId: string, status: string): boolean {
+    this.status = status
+    return true
+  }
+
+  updateExecutionEvidence(): void {}
+
+  appendNodeStatuses(_runId: string, entries: ReadonlyMap<string, JsonValue>): void {
+    if (this.failuresLeft > 0) {
+      this.failuresLeft--
+      this.failedWrites++
+      throw new Error("SQLITE_BUSY: database is locked")
+    }
+    this.writes.push(new Map(entries))
+    for (const [nodeId, entry] of entries) this.nodeStatuses[nodeId] = entry
+  }
+}
+
+function runWorkflow(
+  nodes: readonly GraphNode[],
+  edges: readonly GraphEdge[],
+  options: { store?: RecordingRunStore; fetchImpl?: (url: string, init: UndiciRequestInit) => Promise<Response> } = {},
+) {
+  const store = options.store ?? new RecordingRunStore()
+  const workflows = {
+    getByIdInWorkspace: () => ({ workflowId: "wf-1", workspaceId: "ws-1", name: "wf", nodes, edges, variables: {} }),
+  }
+  const events: RunEvent[] = []
+  let persistedAtFinish: Record<string, JsonValue> | undefined
+  let finish: () => void = () => {}
+  const finished = new Promise<void>((resolve) => {
+    finish = resolve
+  })
+  const clock = new FixedClockProvider("2026-01-02T03:04:05.000Z")
+  const rng = new SeededRandomProvider("0xDEADBEEF")
+  const scheduler = new RunScheduler({
+    runs: store as unknown as RunRepository,
+    workflows: workflows as unknown as WorkflowRepository,
+    http: new SafeHttp({ allowLoopback: true, ...(options.fetchImpl ? { fetchImpl: options.fetchImpl as never } : {}) }),
+    functions: new DynamicFunctions(clock, rng),
+    clock,
+    rng,
+    emitProgress: (_runId, event) => {
+      events.push(event)
+      if (event.kind === "run.finished") {
+        persistedAtFinish = { ...store.nodeStatuses }
+        finish()
+      }
+    },
+  })
+  scheduler.enqueue({ workspaceId: "ws-1", workflowId: "wf-1" })
+  return { store, events, finished, persisted: () => persistedAtFinish }
+}
+
+const statusOf = (entry: JsonValue | undefined): unknown =>
+  entry !== null && typeof entry === "object" && !Array.isArray(entry) ? entry["status"] : undefined
+
+describe("RunScheduler — node status write-behind", () => {
+  it("has every node status persisted by the time run.finished is emitted", async () => {
+    const { finished, persisted, store } = runWorkflow(
+      [
+        { nodeId: "start", type: "start" },
+        { nodeId: "d1", type: "delay", config: { duration: 1 } },
+        { nodeId: "end", type: "end" },
+      ],
+      [
+        { edgeId: "e1", source: "start", target: "d1" },
+        { edgeId: "e2", source: "d1", target: "end" },
+      ],
+    )
+    await finished
+    expect(store.status).toBe("completed")
+    expect(statusOf(persisted()?.["d1"])).toBe("passed")
+    expect(statusOf(persisted()?.["end"])).toBe("passed")
+  })
+
+  it("writes only the latest status when a node reports twice within one batch", async () => {
+    const { finished, store } = runWorkflow(
+      [
+        { nodeId: "start", type: "start" },
+        { nodeId: "d1", type: "delay", config: { duration: 1 } },
+      ],
+      [{ edgeId: "e1", source: "start", target: "d1" }],
+    )
+    await finished
+    // "running" and "passed" land within the debounce; only "passed" is written.
+    const d1Writes = store.writes.filter((batch) => batch.has("d1")).map((batch) => statusOf(batch.get("d1")))
+    expect(d1Writes).toEqual(["passed"])
+  })
+
+  it("flushes a wide fan-out as soon as 32 nodes are pending, without waiting out the debounce", async () => {
+    const fanOut = Array.from({ length: 40 }, (_, i) => `d${i}`)
+    const { finished, store } = runWorkflow(
+      [{ nodeId: "start", type: "start" }, ...fanOut.map((nodeId) => ({ nodeId, type: "delay", config: { duration: 200 } }))],
+      fanOut.map((nodeId, i) => ({ edgeId: `e${i}`, source: "start", target: nodeId })),
+    )
+    // start and every branch report in the same tick; the 32nd entry fills the
+    // batch. Look well inside the 25 ms debounce, so only the early flush can
+    // have run.
+    await new Promise((resolve) => setTimeout(resolve, 5))
+    expect(store.writes).toHaveLength(1)
+    expect(store.writes[0]!.size).toBe(32)
+
+    // The rest go out on a fresh debounce, long before any delay completes.
+    await new Promise((resolve) => setTimeout(resolve, 100))
+    expect(store.writes).toHaveLength(2)
+    const early = new Map([...store.writes[0]!, ...store.writes[1]!])
+    expect(early.size).toBe(41)
+    expect(fanOut.every((nodeId) => statusOf(early.get(nodeId)) === "running")).toBe(true)
+    await finished
+  })
+
+  it("keeps statuses buffered when a debounced write fails and writes them on the next flush", async () => {
+    const store = new RecordingRunStore(1)
+    const { finished, persisted } = runWorkflow(
+      [
+        { nodeId: "start", type: "start" },
+        { nodeId: "d1", type: "delay", config: { duration: 80 } },
+      ],
+      [{ edgeId: "e1", source: "start", target: "d1" }],
+      { store },
+    )
+    await finished
+    expect(store.failedWrites).toBe(1)
+    expect(store.status).toBe("completed")
+    expect(statusOf(persisted()?.["d1"])).toBe("passed")
+  })
+
+  it("sends the redacted variables of the latest extraction with later node events", async () => {
+    const fetchImpl = async (): Promise<Response> =>
+      new Response(JSON.stringify({ token: "super-secret-value-xyz", page: 2 }), { status: 200 })
+    const { finished, events, persisted } = runWorkflow(
+      [
+        { nodeId: "start", type: "start" },
+        {
+          nodeId: "http_1",
+          type: "http-request",
+          config: { method: "GET", url: "http://localhost/login", extractors: { api_key: "body.token", page: "body.page" } },
+        },
+        { nodeId: "d1", type: "delay", config: { duration: 1 } },
+      ],
+      [
+        { edgeId: "e1", source: "start", target: "http_1" },
+        { edgeId: "e2", source: "http_1", target: "d1" },
+      ],
+      { fetchImpl },
+    )
+    await finished
+    const nodeEvents = events.filter((event) => event.kind === "node.status")
+    const httpRunning = nodeEvents.find((event) => event.nodeId === "http_1" && event.status === "running")
+    const delayRunning = nodeEvents.find((event) => event.nodeId === "d1" && event.status === "running")
+    // Before the extraction the snapshot is empty; after it, the new snapshot
+    // is redacted rather than a stale cached copy or the raw values.
+    expect(httpRunning && "variables" in httpRunning ? httpRunning.variables : undefined).toEqual({})
+    expect(delayRunning && "variables" in delayRunning ? delayRunning.variables : undefined).toEqual({
+      api_key: "<SECRET>",
+      page: 2,
+    })
+    expect(JSON.stringify(events)).not.toContain("super-secret-value-xyz")
+    expect(persisted()?.["d1"]).toMatchObject({ variables: { api_key: "<SECRET>", page: 2 } })
+  })
+})
@@ -1,3 +1,4 @@
+import { openAsBlob } from "node:fs"
 import fs from "node:fs/promises"
 import type { ClockProvider, RngProvider } from "./harness/providers"
 import { FormData as UndiciFormData, type RequestInit as UndiciRequestInit } from "undici"
@@ -71,6 +72,11 @@ interface FileUploadLike {
   readonly mimeType?: string
 }
 
+/** The single upstream HTTP result an assertion reads from, or why there is none. */
+type AssertionHttpSource =
+  | { readonly state: "resolved"; readonly nodeId: string; readonly result: NodeResult }
+  | { readonly state: "source-unavailable" | "ambiguous-source" }
+
 /** A target workflow as seen by a Call Workflow node — structural fields only, no run history. */
 export interface ResolvedSubWorkflow {
   readonly name?: string | null
@@ -90,6 +96,8 @@ export interface ExecutorDeps {
   readonly emitProgress?: (event: RunEvent) => void
   /** Workspace-scoped workflow lookup for `type: "workflow"` nodes. Undefined disables the node type entirely. */
   readonly resolveWorkflow?: (workflowId: string) => ResolvedSubWorkflow | undefined
+  /** How long an `all`/`conditional` merge waits for its predecessors. Defaults to 30 s. */
+  readonly mergeTimeoutMs?: number
 }
 
 export interface ExecuteOptions {
@@ -103,6 +111,8 @@ export interface NodeResult {
   readonly statusCode?: number
   readonly body?: unknown
   readonly headers?: Record<string, string>
+  /** Response cookies by name, parsed once from the Set-Cookie lines. */
+  readonly cookies?: Readonly<Record<string, string>>
   readonly duration?: number
   readonly error?: string
   readonly assertionOutcome?: "pass" | "fail"
@@ -114,7 +124,6 @@ export interface NodeResult {
     readonly statusCode: number
     readonly truncated?: boolean
   }
-  readonly mergedByOther?: boolean
   readonly startedAt?: string
   readonly completedAt?: string
   readonly secretRefs?: readonly string[]
@@ -157,10 +166,51 @@ class StopBranch extends Error {
 
 /** The traversal path into an entry node: nothing above it. */
 const EMPTY_PATH: ReadonlySet<string> = new Set<string>()
+/** A `{{ … }}` template expression; the group is the expression text. */
+const TEMPLATE_PATTERN = /\{\{([^}]+)\}\}/
+const TEMPLATE_CACHE_LIMIT = 1024
+/** A dynamic-function call expression, `name(args)`. */
+const FUNCTION_CALL_PATTERN = /^([a-zA-Z_][a-zA-Z0-9_]*)\((.*)\)$/
+/** One matching pair of quotes around a function argument. */
+const ARGUMENT_QUOTES_PATTERN = /^["']|["']$/g
+/** `prev[i].path`: the i-th earlier result (or merge branch), then a dotted path. */
+const PREV_INDEX_PATTERN = /^prev\[(\d+)\]\.(.+)$/
+/** A `{name}` path-variable placeholder in a request URL. */
+const PATH_VARIABLE_PATTERN = /\{([^{}]+)\}/g
+/** Result status for each hundred of HTTP status codes; 5xx and above are server errors. */
+const HTTP_STATUS_BUCKETS = ["unknown", "unknown", "success", "redirect", "client_error", "server_error"] as const
+/** The numeric ordering operators of assertions and merge conditions. */
+const ORDERING_COMPARATORS = new Map<string, (actual: number, expected: number) => boolean>([
+  ["gt", (actual, expected) => actual > expected],
+  ["gte", (actual, expected) => actual >= expected],
+  ["lt", (actual, expected) => actual < expected],
+  ["lte", (actual, expected) => actual <= expected],
+])
+/** Operators that compare an array's or object's size rather than the collection itself. */
+const SIZE_COMPARED_OPERATORS: ReadonlySet<string> = new Set(["gt", "gte", "lt", "lte", "equals", "notEquals"])
+/** Node result statuses that collapse into the executor's own error/warning outcome. */
+const EXECUTION_STATUSES: ReadonlyMap<string, string> = new Map([
+  ["client_error", "error"],
+  ["server_error", "error"],
+  ["error", "error"],
+  ["redirect", "warning"],
+])
+/** Every character a JSON text can open with (after whitespace). */
+const JSON_START_CHARS = "{[\"-0123456789tfn"
 
 export class WorkflowExecutor {
   private readonly results = new Map<string, NodeResult>()
+  /**
+   * Keys of `results` in insertion order, so `{{prev.*}}` and `{{prev[i].*}}`
+   * index straight into it instead of walking the map.
+   */
+  private readonly resultOrder: string[] = []
   private readonly workflowVariables: Record<string, unknown> = {}
+  /**
+   * Copy of `workflowVariables` shared by every progress event until the next
+   * write, instead of a fresh copy per event. Writers call `variablesChanged`.
+   */
+  private variablesSnapshot: Readonly<Record<string, unknown>> | null = null
   private readonly environmentVariables: Record<string, unknown>
   private readonly nodeStatuses = new Map<string, RunnerNodeStatus>()
   private readonly failedNodes = new Set<string>()
@@ -168,7 +218,13 @@ export class WorkflowExecutor {
   private firstErrorMessage: string | null = null
   private readonly branchResults = new Map<string, ReadonlyArray<readonly [string, NodeResult]>>()
   private currentBranchContext: ReadonlyArray<readonly [string, NodeResult]> = []
-  private readonly mergeCompleted = new Set<string>()
+  /**
+   * The one run of each merge node, settled (never rejected) when it finishes.
+   * Every branch enters the merge, but only the first arrival runs it.
+   */
+  private readonly mergeRuns = new Map<string, Promise<unknown>>()
+  /** Merges waiting on predecessors, told the id of each node as it settles. */
+  private readonly settleWaiters = new Set<(nodeId: string) => void>()
   /**
    * One traversal per node per run, keyed by node id. The handle resolves with
    * that traversal's outcome (never rejects) so a second path into the node can
@@ -176,6 +232,10 @@ export class WorkflowExecutor {
    */
   private readonly nodeRuns = new Map<string, Promise<unknown>>()
   private workflowNodes = new Map<string, WorkflowNode>()
+  /** Source ids of each node's incoming edges, in edge order. Rebuilt per run. */
+  private incomingSources = new Map<string, string[]>()
+  /** Each node's outgoing edges, in edge order. Rebuilt per run. */
+  private outgoingEdges = new Map<string, WorkflowEdge[]>()
   private activeRunId = "harness"
   private stepCount = 0
   private maxSteps = 0
@@ -185,6 +245,7 @@ export class WorkflowExecutor {
   // still can't hang or stack-overflow a run.
   private callDepth = 0
   private static readonly MAX_CALL_DEPTH = 8
+  private static readonly DEFAULT_MERGE_TIMEOUT_MS = 30000
 
   public constructor(private readonly deps: ExecutorDeps) {
     this.environmentVariables = { ...(deps.environmentVariables ?? {}) }
@@ -203,6 +264,7 @@ export class WorkflowExecutor {
       for (const [key, value] of Object.entries(workflow.variables)) {
         this.workflowVariables[key] = value
       }
+      this.variablesChanged()
     }
 
     const continueOnFail = workflow.settings?.continueOnFail ?? false
@@ -210,11 +272,26 @@ export class WorkflowExecutor {
     this.firstErrorMessage = null
 
     const nodes = new Map<string, WorkflowNode>()
+    let startNodeId: string | undefined
     for (const node of workflow.nodes) {
       nodes.set(node.nodeId, node)
+      if (startNodeId === undefined && node.type === "start") startNodeId = node.nodeId
     }
     this.workflowNodes = nodes
     const edges = workflow.edges
+    // Routing reads a node's neighbours on every step; index the edges once.
+    const incomingSources = new Map<string, string[]>()
+    const outgoingEdges = new Map<string, WorkflowEdge[]>()
+    for (const edge of edges) {
+      const sources = incomingSources.get(edge.target)
+      if (sources) sources.push(edge.source)
+      else incomingSources.set(edge.target, [edge.source])
+      const outgoing = outgoingEdges.get(edge.source)
+      if (outgoing) outgoing.push(edge)
+      else outgoingEdges.set(edge.source, [edge])
+    }
+    this.incomingSources = incomingSources
+    this.outgoingEdges = outgoingEdges
 
     // ponytail: global step budget guards against cyclic graphs (start->delay->start)
     // recursing forever — schemas/renderer don't enforce acyclicity. Generous cap so
@@ -225,17 +302,17 @@ export class WorkflowExecutor {
     // Per-run, like the step budget above it: a handle left over from a previous
     // run would make every node on that path look already-executed.
     this.nodeRuns.clear()
+    this.mergeRuns.clear()
 
     let entryNodeIds: string[] = []
     if (options.startNodeIds && options.startNodeIds.length > 0) {
       entryNodeIds = options.startNodeIds.filter((id) => nodes.has(id))
     }
     if (entryNodeIds.length === 0) {
-      const startNode = workflow.nodes.find((n) => n.type === "start")
-      if (!startNode) {
+      if (startNodeId === undefined) {
         return this.buildOutput(caseName, startedAt, seed, "failed")
       }
-      entryNodeIds = [startNode.nodeId]
+      entryNodeIds = [startNodeId]
     }
 
     if (options.cancelSignal?.aborted) {
@@ -244,10 +321,10 @@ export class WorkflowExecutor {
 
     try {
       if (entryNodeIds.length === 1) {
-        await this.executeFromNode(entryNodeIds[0]!, nodes, edges, options.cancelSignal, continueOnFail)
+        await this.executeFromNode(entryNodeIds[0]!, nodes, options.cancelSignal, continueOnFail)
       } else {
         const tasks = entryNodeIds.map((id) =>
-          this.executeFromNode(id, nodes, edges, options.cancelSignal, continueOnFail),
+          this.executeFromNode(id, nodes, options.cancelSignal, continueOnFail),
         )
         const settled = await Promise.allSettled(tasks)
         for (const result of settled) {
@@ -288,12 +365,18 @@ export class WorkflowExecutor {
     if (error instanceof StopBranch) throw error
     this.hasFailures = true
     this.failedNodes.add(nodeId)
+    this.notifyNodeSettled(nodeId)
     if (!this.firstErrorMessage) {
       this.firstErrorMessage = String(error)
     }
     if (!continueOnFail) throw error
   }
 
+  /** Tell every merge waiting in `waitForPredecessors` that `nodeId` has settled. */
+  private notifyNodeSettled(nodeId: string): void {
+    for (const wake of this.settleWaiters) wake(nodeId)
+  }
+
   /**
    * Wait for a traversal already in flight for `nodeId`, if one exists.
    *
@@ -316,7 +399,7 @@ export class WorkflowExecutor {
    * executed once per path — for an http-request node that means the request is
    * genuinely sent twice, and the canvas shows the node go running → failed →
    * running → failed (`video/apiweave 4.mp4`, t=13.7–14.4s). `merge` was the
-   * only node type immune, because it carries its own `mergeCompleted` guard.
+   * only node type immune, because it carries its own `mergeRuns` guard.
    *
    * The second arrival joins the first instead of starting a second one: it
    * waits for that subtree to finish and returns without traversing further,
@@ -337,7 +420,6 @@ export class WorkflowExecutor {
   private async executeFromNode(
     nodeId: string,
     nodes: Map<string, WorkflowNode>,
-    edges: readonly WorkflowEdge[],
     cancelSignal: AbortSignal | undefined,
     continueOnFail: boolean,
     ancestors: ReadonlySet<string> = EMPTY_PATH,
@@ -347,7 +429,7 @@ export class WorkflowExecutor {
     if (cancelSignal?.aborted) return
 
     if (node.type === "merge" || node.type === "start" || ancestors.has(nodeId)) {
-      return this.traverseFromNode(node, nodes, edges, cancelSignal, continueOnFail, ancestors)
+      return this.traverseFromNode(node, nodes, cancelSignal, continueOnFail, ancestors)
     }
 
     if (await this.joinInFlightRun(nodeId)) return
@@ -360,7 +442,7 @@ export class WorkflowExecutor {
 
     let outcome: unknown = null
     try {
-      await this.traverseFromNode(node, nodes, edges, cancelSignal, continueOnFail, ancestors)
+      await this.traverseFromNode(node, nodes, cancelSignal, continueOnFail, ancestors)
     } catch (error) {
       outcome = error
       throw error
@@ -375,7 +457,6 @@ export class WorkflowExecutor {
   private async traverseFromNode(
     node: WorkflowNode,
     nodes: Map<string, WorkflowNode>,
-    edges: readonly WorkflowEdge[],
     cancelSignal: AbortSignal | undefined,
     continueOnFail: boolean,
     ancestors: ReadonlySet<string>,
@@ -387,33 +468,29 @@ export class WorkflowExecutor {
       const message = `Workflow graph cycle detected at node ${nodeId}`
       this.hasFailures = true
       this.failedNodes.add(nodeId)
+      this.notifyNodeSettled(nodeId)
       if (!this.firstErrorMessage) this.firstErrorMessage = message
       this.updateNodeStatus(nodeId, "failed", { status: "error", error: message })
       throw new StopBranch(message)
     }
 
     // Set branch context if predecessor is a merge
-    const incomingEdges = edges.filter((e) => e.target === nodeId)
-    if (incomingEdges.length > 0) {
-      for (const edge of incomingEdges) {
-        const predId = edge.source
-        const predBranches = this.branchResults.get(predId)
-        if (predBranches) {
-          const nextEdgesFromNode = edges.filter((e) => e.source === nodeId)
-          if (nextEdgesFromNode.length > 1) {
-            this.currentBranchContext = predBranches
-          } else {
-            this.currentBranchContext = []
-          }
-          break
+    for (const predId of this.incomingSources.get(nodeId) ?? []) {
+      const predBranches = this.branchResults.get(predId)
+      if (predBranches) {
+        if ((this.outgoingEdges.get(nodeId)?.length ?? 0) > 1) {
+          this.currentBranchContext = predBranches
+        } else {
+          this.currentBranchContext = []
         }
+        break
       }
     }
 
     // Execute node (skip start)
     if (node.type !== "start") {
       try {
-        const nodeExecResult = await this.executeNode(node, edges, cancelSignal, continueOnFail)
+        const nodeExecResult = await this.executeNode(node, cancelSignal, continueOnFail)
         if (nodeExecResult !== null && nodeExecResult.shouldContinue === false) {
           return
         }
@@ -425,7 +502,7 @@ export class WorkflowExecutor {
     }
 
     // Find next nodes
-    let nextEdges = edges.filter((e) => e.source === nodeId)
+    let nextEdges: readonly WorkflowEdge[] = this.outgoingEdges.get(nodeId) ?? []
     if (nextEdges.length === 0) return
 
     // Assertion routing
@@ -437,11 +514,16 @@ export class WorkflowExecutor {
           ? node.config["continueOnFail"]
           : continueOnFail
 
-      const handleEdges = nextEdges.filter((e) => e.sourceHandle === "pass" || e.sourceHandle === "fail")
-      const legacyEdges = nextEdges.filter((e) => !e.sourceHandle)
+      // One pass sorts the outgoing edges by handle.
+      const handleEdges = { pass: [] as WorkflowEdge[], fail: [] as WorkflowEdge[] }
+      const legacyEdges: WorkflowEdge[] = []
+      for (const edge of nextEdges) {
+        if (edge.sourceHandle === "pass" || edge.sourceHandle === "fail") handleEdges[edge.sourceHandle].push(edge)
+        else if (!edge.sourceHandle) legacyEdges.push(edge)
+      }
 
-      if (handleEdges.length > 0) {
-        const matching = handleEdges.filter((e) => e.sourceHandle === outcome)
+      if (handleEdges.pass.length > 0 || handleEdges.fail.length > 0) {
+        const matching = handleEdges[outcome]
         if (matching.length > 0) {
           nextEdges = matching
         } else {
@@ -478,7 +560,7 @@ export class WorkflowExecutor {
           if (nextNode.type === "end") {
             this.updateNodeStatus(nextNodeId, "passed")
           } else {
-            tasks.push(this.executeBranch(nextNodeId, nodes, edges, cancelSignal, continueOnFail, path))
+            tasks.push(this.executeBranch(nextNodeId, nodes, cancelSignal, continueOnFail, path))
           }
         }
       }
@@ -496,6 +578,7 @@ export class WorkflowExecutor {
               const branchNodeId = nextEdges[i]!.target
               this.hasFailures = true
               this.failedNodes.add(branchNodeId)
+              this.notifyNodeSettled(branchNodeId)
               if (!this.firstErrorMessage) {
                 this.firstErrorMessage = String(r.reason)
               }
@@ -516,7 +599,7 @@ export class WorkflowExecutor {
           this.updateNodeStatus(nextNodeId, "passed")
         } else {
           try {
-            await this.executeFromNode(nextNodeId, nodes, edges, cancelSignal, continueOnFail, path)
+            await this.executeFromNode(nextNodeId, nodes, cancelSignal, continueOnFail, path)
           } catch (error) {
             this.recordNodeFailure(nextNodeId, error, continueOnFail)
           }
@@ -528,23 +611,29 @@ export class WorkflowExecutor {
   private async executeBranch(
     nodeId: string,
     nodes: Map<string, WorkflowNode>,
-    edges: readonly WorkflowEdge[],
     cancelSignal: AbortSignal | undefined,
     continueOnFail: boolean,
     ancestors: ReadonlySet<string>,
   ): Promise<void> {
-    await this.executeFromNode(nodeId, nodes, edges, cancelSignal, continueOnFail, ancestors)
+    await this.executeFromNode(nodeId, nodes, cancelSignal, continueOnFail, ancestors)
   }
 
   private async executeNode(
     node: WorkflowNode,
-    edges: readonly WorkflowEdge[],
     cancelSignal: AbortSignal | undefined,
     continueOnFail: boolean,
   ): Promise<{ shouldContinue: boolean } | null> {
     const nodeId = node.nodeId
     const nodeType = node.type
 
+    // A branch arriving at a merge someone else is already running waits for
+    // that run and stops there, so the downstream is walked once.
+    const mergeRun = nodeType === "merge" ? this.mergeRuns.get(nodeId) : undefined
+    if (mergeRun) {
+      await mergeRun
+      return { shouldContinue: false }
+    }
+
     this.updateNodeStatus(nodeId, "running")
     // Stamp the node's execution window on the injected clock so the run
     // timeline/waterfall can place bars on an absolute run timeline.
@@ -559,9 +648,11 @@ export class WorkflowExecutor {
       } else if (nodeType === "delay") {
         result = await this.executeDelay(node, cancelSignal)
       } else if (nodeType === "assertion") {
-        result = await this.executeAssertion(node, edges)
+        result = await this.executeAssertion(node)
       } else if (nodeType === "merge") {
-        result = await this.executeMerge(node, edges)
+        const run = this.executeMerge(node, cancelSignal)
+        this.mergeRuns.set(nodeId, run.catch(() => undefined))
+        result = await run
       } else if (nodeType === "workflow") {
         result = await this.executeCallWorkflow(node)
       } else {
@@ -569,23 +660,15 @@ export class WorkflowExecutor {
       }
 
       // Determine execution status
-      let executionStatus = result.status ?? "success"
-      if (executionStatus === "client_error" || executionStatus === "server_error" || executionStatus === "error") {
+      const resultStatus = result.status ?? "success"
+      let executionStatus = EXECUTION_STATUSES.get(resultStatus) ?? resultStatus
+      if (executionStatus === "failed" && nodeType === "assertion") {
         executionStatus = "error"
-        this.hasFailures = true
-        this.failedNodes.add(nodeId)
-      } else if (executionStatus === "redirect") {
-        executionStatus = "warning"
-      } else if (executionStatus === "failed" && nodeType === "assertion") {
-        executionStatus = "error"
-        this.hasFailures = true
-        this.failedNodes.add(nodeId)
         if (!this.firstErrorMessage) this.firstErrorMessage = result.message ?? "Assertion failed"
       }
-
-      // Check if merge was completed by another branch
-      if (result.mergedByOther) {
-        return { shouldContinue: false }
+      if (executionStatus === "error") {
+        this.hasFailures = true
+        this.failedNodes.add(nodeId)
       }
 
       // Update node status
@@ -593,7 +676,9 @@ export class WorkflowExecutor {
       const nodeCompletedAt = this.deps.clock.isoNow()
       this.updateNodeStatus(nodeId, mappedStatus, result)
       result = { ...result, type: nodeType, startedAt: nodeStartedAt, completedAt: nodeCompletedAt, secretRefs }
+      if (!this.results.has(nodeId)) this.resultOrder.push(nodeId)
       this.results.set(nodeId, result)
+      this.notifyNodeSettled(nodeId)
 
       // Handle failures
       if (executionStatus === "error" && nodeType !== "assertion" && !continueOnFail) {
@@ -615,8 +700,10 @@ export class WorkflowExecutor {
         secretRefs,
       }
       this.updateNodeStatus(nodeId, "failed", errorResult)
+      if (!this.results.has(nodeId)) this.resultOrder.push(nodeId)
       this.results.set(nodeId, errorResult)
       this.failedNodes.add(nodeId)
+      this.notifyNodeSettled(nodeId)
       this.hasFailures = true
       if (!this.firstErrorMessage) this.firstErrorMessage = `Node ${nodeId} failed`
       if (!continueOnFail) throw new StopBranch(errorResult.error ?? `Node ${nodeId} failed`)
@@ -656,24 +743,32 @@ export class WorkflowExecutor {
       url = `${this.deps.baseUrl}${url}`
     }
 
-    const pathVariables = this.normalizeKeyValueField(config["pathVariables"] as KVField)
-    for (const [key, value] of Object.entries(pathVariables)) {
-      url = url.split(`{${key}}`).join(encodeURIComponent(value))
+    // Headers, auth, cookies and body of one request share resolved templates,
+    // so a token or base URL repeated across them is looked up once. The URL
+    // above stays out of it: it is rendered with secrets disallowed.
+    const memo: TemplateMemo = new Map()
+    const pathVariables = this.normalizeKeyValueField(config["pathVariables"] as KVField, memo)
+    if (Object.keys(pathVariables).length > 0) {
+      // One pass over the URL; placeholders without a matching variable stay as they are.
+      url = url.replace(PATH_VARIABLE_PATTERN, (match, name: string) =>
+        Object.hasOwn(pathVariables, name) ? encodeURIComponent(pathVariables[name]!) : match,
+      )
     }
 
-    const headers = this.normalizeKeyValueField(headersField)
-    const queryParams = this.normalizeKeyValueField(config["queryParams"] as KVField)
-    const cookies = this.normalizeKeyValueField(config["cookies"] as KVField)
+    const headers = this.normalizeKeyValueField(headersField, memo)
+    const queryParams = this.normalizeKeyValueField(config["queryParams"] as KVField, memo)
+    const cookies = this.normalizeKeyValueField(config["cookies"] as KVField, memo)
 
-    if (Object.keys(cookies).length > 0) {
-      const cookieHeader = Object.entries(cookies)
-        .map(([key, value]) => `${key}=${value}`)
-        .join("; ")
+    let cookieHeader = ""
+    for (const [key, value] of Object.entries(cookies)) {
+      cookieHeader = cookieHeader ? `${cookieHeader}; ${key}=${value}` : `${key}=${value}`
+    }
+    if (cookieHeader) {
       const existingCookie = headers["Cookie"] ?? headers["cookie"]
       headers["Cookie"] = existingCookie ? `${existingCookie}; ${cookieHeader}` : cookieHeader
     }
 
-    this.applyAuthConfig(auth, headers, queryParams)
+    this.applyAuthConfig(auth, headers, queryParams, memo)
 
     if (Object.keys(queryParams).length > 0) {
       const [base = url, existingQuery] = url.split("?")
@@ -682,11 +777,13 @@ export class WorkflowExecutor {
       url = `${base}?${params.toString()}`
     }
 
-    const startTime = Date.now()
+    // Monotonic: a wall-clock step (NTP, DST on some hosts) mid-request would
+    // otherwise show up as a negative or inflated duration.
+    const startTime = performance.now()
 
     let fetchBody: string | Buffer | UndiciFormData | undefined
     try {
-      fetchBody = await this.buildHttpRequestBody(bodyType, body, headers, formDataEntries, urlEncodedEntries, fileUploads)
+      fetchBody = await this.buildHttpRequestBody(bodyType, body, headers, formDataEntries, urlEncodedEntries, fileUploads, memo)
     } catch (bodyError) {
       return withExtractorOutcomes({ status: "error", error: `Failed to build request body: ${String(bodyError)}`, method, url, duration: 0 })
     }
@@ -706,35 +803,27 @@ export class WorkflowExecutor {
       const response = await this.deps.http.safeFetch(url, fetchInit, { followRedirects, rejectUnauthorized: sslVerify })
       const { text: responseText, truncated } = await this.deps.http.readTextCapped(response, SIDE_TABLE_THRESHOLD_BYTES)
       const statusCode = response.status
-      const duration = Date.now() - startTime
+      const duration = Math.round(performance.now() - startTime)
 
-      let responseBody: unknown
-      if (truncated) {
-        responseBody = responseText
-      } else {
-        try {
-          responseBody = JSON.parse(responseText)
-        } catch {
-          responseBody = responseText
-        }
-      }
+      const responseBody = truncated ? responseText : parseResponseBody(responseText)
 
-      let status: string
-      if (statusCode >= 200 && statusCode < 300) status = "success"
-      else if (statusCode >= 300 && statusCode < 400) status = "redirect"
-      else if (statusCode >= 400 && statusCode < 500) status = "client_error"
-      else if (statusCode >= 500) status = "server_error"
-      else status = "unknown"
+      const status = httpStatusBucket(statusCode)
 
       const responseHeaders: Record<string, string> = {}
       response.headers.forEach((value, key) => {
         responseHeaders[key] = value
       })
+      // Iteration hands each Set-Cookie line over separately, so the loop above
+      // kept only the last one. Keep the whole set, joined the way
+      // `Headers.get` would, and parse the cookies once from the unjoined lines.
+      const setCookies = response.headers.getSetCookie()
+      if (setCookies.length > 1) responseHeaders["set-cookie"] = setCookies.join(", ")
 
       const result: NodeResult = {
         status,
         statusCode,
         headers: responseHeaders,
+        cookies: parseSetCookies(setCookies),
         body: responseBody,
         duration,
         method,
@@ -752,7 +841,7 @@ export class WorkflowExecutor {
       if (error instanceof SafeUrlError) {
         return withExtractorOutcomes({ status: "error", error: `SSRF blocked: ${error.message}`, method, url, duration: 0 })
       }
-      return withExtractorOutcomes({ status: "error", error: String(error), method, url, duration: Date.now() - startTime })
+      return withExtractorOutcomes({ status: "error", error: String(error), method, url, duration: Math.round(performance.now() - startTime) })
     }
   }
 
@@ -791,7 +880,7 @@ export class WorkflowExecutor {
 
   // -------------------- Assertion --------------------
 
-  private async executeAssertion(node: WorkflowNode, edges: readonly WorkflowEdge[]): Promise<NodeResult> {
+  private async executeAssertion(node: WorkflowNode): Promise<NodeResult> {
     const config = node.config ?? {}
     type AssertionDef = {
       readonly field?: string
@@ -831,6 +920,11 @@ export class WorkflowExecutor {
     const evaluations: AssertionEvaluation[] = []
     const failureMode = config["failureMode"] === "all" ? "all" : "first"
     let stopped = false
+    // Every rule of a node reads the same upstream response; walk the graph for
+    // it once, and only when a rule actually needs it.
+    let httpSource: AssertionHttpSource | undefined
+    const resolveHttpSource = (): AssertionHttpSource =>
+      (httpSource ??= this.resolveAssertionHttpSource(node.nodeId))
 
     for (let index = 0; index < assertions.length; index++) {
       const assertion = assertions[index]!
@@ -839,7 +933,7 @@ export class WorkflowExecutor {
         continue
       }
 
-      const evaluation = this.evaluateAssertion(node.nodeId, index, assertion, edges)
+      const evaluation = this.evaluateAssertion(index, assertion, resolveHttpSource)
       evaluations.push(evaluation)
       if (evaluation.outcome === "fail" && failureMode === "first") stopped = true
     }
@@ -863,7 +957,6 @@ export class WorkflowExecutor {
   }
 
   private evaluateAssertion(
-    assertionNodeId: string,
     ruleIndex: number,
     assertion: {
       readonly field?: string
@@ -873,7 +966,7 @@ export class WorkflowExecutor {
       readonly expectedValue?: unknown
       readonly source?: string
     },
-    edges: readonly WorkflowEdge[],
+    resolveHttpSource: () => AssertionHttpSource,
   ): AssertionEvaluation {
     const source = toAssertionSource(assertion.source)
     const path = assertion.path ?? assertion.field ?? ""
@@ -905,7 +998,7 @@ export class WorkflowExecutor {
     if (source === "variables") {
       actual = this.workflowVariables[path]
     } else {
-      const resolution = this.resolveAssertionHttpSource(assertionNodeId, edges)
+      const resolution = resolveHttpSource()
       if (resolution.state !== "resolved") {
         return {
           ...base,
@@ -1001,13 +1094,8 @@ export class WorkflowExecutor {
       : { state: "resolved-template", value }
   }
 
-  private resolveAssertionHttpSource(
-    assertionNodeId: string,
-    edges: readonly WorkflowEdge[],
-  ):
-    | { readonly state: "resolved"; readonly nodeId: string; readonly result: NodeResult }
-    | { readonly state: "source-unavailable" | "ambiguous-source" } {
-    const queue = edges.filter((edge) => edge.target === assertionNodeId).map((edge) => edge.source)
+  private resolveAssertionHttpSource(assertionNodeId: string): AssertionHttpSource {
+    const queue = [...(this.incomingSources.get(assertionNodeId) ?? [])]
     const visited = new Set<string>()
     const sourceIds = new Set<string>()
 
@@ -1020,9 +1108,7 @@ export class WorkflowExecutor {
         sourceIds.add(nodeId)
         continue
       }
-      for (const edge of edges) {
-        if (edge.target === nodeId) queue.push(edge.source)
-      }
+      queue.push(...(this.incomingSources.get(nodeId) ?? []))
     }
 
     if (sourceIds.size !== 1) {
@@ -1047,19 +1133,9 @@ export class WorkflowExecutor {
 
   /** Value of a Set-Cookie cookie by name, from the last response. */
   private getResponseCookie(result: NodeResult, name: string): string | undefined {
-    const raw = this.getResponseHeader(result, "set-cookie")
-    if (!raw) return undefined
-    const target = name.trim()
-    // ponytail: split multiple cookies on the comma that precedes the next
-    // `name=` pair; good enough for typical Set-Cookie. Swap for a real
-    // set-cookie parser if Expires/edge attributes ever misparse.
-    for (const part of raw.split(/,(?=\s*[^=;,\s]+=)/)) {
-      const pair = part.split(";")[0] ?? ""
-      const eq = pair.indexOf("=")
-      if (eq === -1) continue
-      if (pair.slice(0, eq).trim() === target) return pair.slice(eq + 1).trim()
-    }
-    return undefined
+    const cookies = result.cookies
+    const key = name.trim()
+    return cookies && Object.hasOwn(cookies, key) ? cookies[key] : undefined
   }
 
   private compareValues(actual: unknown, operator: string, expected: unknown): boolean {
@@ -1070,10 +1146,10 @@ export class WorkflowExecutor {
 
     if (operator === "count") {
       let actualCount: number
-      if (Array.isArray(actual) || typeof actual === "string") {
+      if (typeof actual === "string") {
         actualCount = actual.length
       } else if (typeof actual === "object" && actual !== null) {
-        actualCount = Object.keys(actual).length
+        actualCount = collectionSize(actual)
       } else {
         actualCount = actual !== null && actual !== undefined ? Number(actual) : 0
       }
@@ -1081,50 +1157,34 @@ export class WorkflowExecutor {
       return actualCount === expectedCount
     }
 
-    if (Array.isArray(actual) || (typeof actual === "object" && actual !== null && !Array.isArray(actual))) {
-      if (["gt", "gte", "lt", "lte", "equals", "notEquals"].includes(operator)) {
-        actual = Array.isArray(actual) ? actual.length : Object.keys(actual).length
-      }
+    if (typeof actual === "object" && actual !== null && SIZE_COMPARED_OPERATORS.has(operator)) {
+      actual = collectionSize(actual)
     }
 
-    let expectedNum: number | null = null
-    let actualNum: number | null = null
-    try {
-      if (expected !== null && expected !== undefined) {
-        const n = Number(expected)
-        if (!Number.isNaN(n)) expectedNum = n
-      }
-      if (actual !== null && actual !== undefined) {
-        const n = Number(actual)
-        if (!Number.isNaN(n)) actualNum = n
-      }
-    } catch {
-      expectedNum = null
-      actualNum = null
+    // Each operator coerces only to what it compares: numbers for the ordering
+    // operators, strings for contains, numbers-then-strings for equality.
+    const ordering = ORDERING_COMPARATORS.get(operator)
+    if (ordering) {
+      const expectedNum = toComparableNumber(expected)
+      const actualNum = toComparableNumber(actual)
+      return expectedNum !== null && actualNum !== null && ordering(actualNum, expectedNum)
     }
 
-    const actualStr = actual !== null && actual !== undefined ? String(actual) : ""
-    const expectedStr = expected !== null && expected !== undefined ? String(expected) : ""
-
     switch (operator) {
-      case "equals":
-        if (expectedNum !== null && actualNum !== null) return actualNum === expectedNum
-        return actualStr === expectedStr
-      case "notEquals":
-        if (expectedNum !== null && actualNum !== null) return actualNum !== expectedNum
-        return actualStr !== expectedStr
       case "contains":
-        return actualStr.includes(expectedStr)
+        return toComparableString(actual).includes(toComparableString(expected))
       case "notContains":
-        return !actualStr.includes(expectedStr)
-      case "gt":
-        return expectedNum !== null && actualNum !== null && actualNum > expectedNum
-      case "gte":
-        return expectedNum !== null && actualNum !== null && actualNum >= expectedNum
-      case "lt":
-        return expectedNum !== null && actualNum !== null && actualNum < expectedNum
-      case "lte":
-        return expectedNum !== null && actualNum !== null && actualNum <= expectedNum
+        return !toComparableString(actual).includes(toComparableString(expected))
+      case "equals":
+      case "notEquals": {
+        const expectedNum = toComparableNumber(expected)
+        const actualNum = expectedNum === null ? null : toComparableNumber(actual)
+        const equal =
+          expectedNum !== null && actualNum !== null
+            ? actualNum === expectedNum
+            : toComparableString(actual) === toComparableString(expected)
+        return operator === "equals" ? equal : !equal
+      }
       default:
         throw new Error(`Unknown operator: ${operator}`)
     }
@@ -1132,54 +1192,33 @@ export class WorkflowExecutor {
 
   // -------------------- Merge --------------------
 
-  private async executeMerge(node: WorkflowNode, edges: readonly WorkflowEdge[]): Promise<NodeResult> {
+  private async executeMerge(node: WorkflowNode, cancelSignal?: AbortSignal): Promise<NodeResult> {
     const config = node.config ?? {}
     const mergeStrategy = (config["mergeStrategy"] as string | undefined) ?? "all"
     const nodeId = node.nodeId
 
-    if (this.mergeCompleted.has(nodeId)) {
-      return { status: "success", mergedByOther: true }
-    }
-
-    const incomingEdges = edges.filter((e) => e.target === nodeId)
-    const predecessorNodeIds = incomingEdges.map((e) => e.source)
+    const predecessorNodeIds = this.incomingSources.get(nodeId) ?? []
 
     if (mergeStrategy === "all" || mergeStrategy === "conditional") {
-      let missing = predecessorNodeIds.filter((id) => !this.results.has(id) && !this.failedNodes.has(id))
-      if (missing.length > 0) {
-        const maxWait = 30000
-        const waitInterval = 100
-        let elapsed = 0
-        while (missing.length > 0 && elapsed < maxWait) {
-          await new Promise((resolve) => setTimeout(resolve, waitInterval))
-          elapsed += waitInterval
-          missing = predecessorNodeIds.filter((id) => !this.results.has(id) && !this.failedNodes.has(id))
-        }
-        if (missing.length > 0) {
-          throw new Error(`Timeout waiting for predecessors: ${missing.join(", ")}`)
-        }
-      }
+      await this.waitForPredecessors(predecessorNodeIds, cancelSignal)
 
       const failed = predecessorNodeIds.filter((id) => this.failedNodes.has(id))
       if (failed.length > 0) {
         throw new Error(`Cannot merge: ${failed.length} predecessor(s) failed`)
       }
     } else if (mergeStrategy === "any" || mergeStrategy === "first") {
-      const completed = predecessorNodeIds.filter((id) => this.results.has(id))
-      if (completed.length === 0) {
+      if (!predecessorNodeIds.some((id) => this.results.has(id))) {
         throw new Error(`All ${predecessorNodeIds.length} branches failed or timed out`)
       }
     }
 
     if (mergeStrategy === "conditional") {
-      this.evaluateMergeConditions(config, predecessorNodeIds, edges)
+      this.evaluateMergeConditions(config, predecessorNodeIds)
     }
 
-    this.mergeCompleted.add(nodeId)
-
     const predecessorResults: Array<readonly [string, NodeResult]> = []
     for (const predId of predecessorNodeIds) {
-      const dataNodeId = this.findDataProducingAncestor(predId, edges)
+      const dataNodeId = this.findDataProducingAncestor(predId)
       const result = this.results.get(dataNodeId)
       if (result && result.type === "http-request") {
         predecessorResults.push([dataNodeId, result])
@@ -1256,6 +1295,7 @@ export class WorkflowExecutor {
         this.workflowVariables[callerVarName] = childOutput.extractedVariables[subVarName]
       }
     }
+    this.variablesChanged()
 
     const targetLabel = target.name ?? targetWorkflowId
     return {
@@ -1274,6 +1314,48 @@ export class WorkflowExecutor {
     }
   }
 
+  /**
+   * Resolve once every predecessor has a result or is marked failed. Rather than
+   * polling, the wait crosses each predecessor off as it settles, under one
+   * deadline (`mergeTimeoutMs`) for the whole wait. A cancelled run ends the
+   * wait too: branches that had not started yet never settle, so the merge
+   * would otherwise hold the run open until the deadline.
+   */
+  private async waitForPredecessors(
+    predecessorNodeIds: readonly string[],
+    cancelSignal: AbortSignal | undefined,
+  ): Promise<void> {
+    // Computed once; each settle event then only removes the node it names.
+    const pending = new Set(predecessorNodeIds.filter((id) => !this.results.has(id) && !this.failedNodes.has(id)))
+    if (pending.size === 0) return
+
+    if (cancelSignal?.aborted) throw new Error("Merge cancelled")
+
+    const timeoutMs = this.deps.mergeTimeoutMs ?? WorkflowExecutor.DEFAULT_MERGE_TIMEOUT_MS
+    await new Promise<void>((resolve, reject) => {
+      const wake = (nodeId: string): void => {
+        if (!pending.delete(nodeId) || pending.size > 0) return
+        settle()
+        resolve()
+      }
+      const timer = setTimeout(() => {
+        settle()
+        reject(new Error(`Timeout waiting for predecessors: ${[...pending].join(", ")}`))
+      }, timeoutMs)
+      const cancel = (): void => {
+        settle()
+        reject(new Error("Merge cancelled"))
+      }
+      const settle = (): void => {
+        clearTimeout(timer)
+        this.settleWaiters.delete(wake)
+        cancelSignal?.removeEventListener("abort", cancel)
+      }
+      this.settleWaiters.add(wake)
+      cancelSignal?.addEventListener("abort", cancel, { once: true })
+    })
+  }
+
   /**
    * Gate a conditional merge: throws if the saved branch conditions do not
    * pass under the configured AND/OR logic. branchIndex is the zero-based
@@ -1282,7 +1364,6 @@ export class WorkflowExecutor {
   private evaluateMergeConditions(
     config: Record<string, unknown>,
     predecessorNodeIds: readonly string[],
-    edges: readonly WorkflowEdge[],
   ): void {
     const raw = config["conditions"]
     const conditions = Array.isArray(raw)
@@ -1290,17 +1371,38 @@ export class WorkflowExecutor {
       : []
     if (conditions.length === 0) return
 
-    const branchResults = predecessorNodeIds.map((predId) =>
-      this.results.get(this.findDataProducingAncestor(predId, edges)),
-    )
+    // Resolved on first use and only for branches a condition actually targets.
+    const branchResults = new Map<number, NodeResult | undefined>()
+    const branchResult = (branchIndex: number): NodeResult | undefined => {
+      if (!branchResults.has(branchIndex)) {
+        const predId = predecessorNodeIds[branchIndex]
+        branchResults.set(
+          branchIndex,
+          predId === undefined ? undefined : this.results.get(this.findDataProducingAncestor(predId)),
+        )
+      }
+      return branchResults.get(branchIndex)
+    }
+
+    // Variables do not change while the gate is evaluated, so the same expected
+    // value only needs substituting once.
+    const substituted = new Map<string, string>()
+    const substitute = (text: string): string => {
+      let value = substituted.get(text)
+      if (value === undefined) {
+        value = this.substituteVariables(text)
+        substituted.set(text, value)
+      }
+      return value
+    }
 
     const outcome = (condition: (typeof conditions)[number]): boolean => {
-      const branch = branchResults[condition.branchIndex ?? 0]
+      const branch = branchResult(condition.branchIndex ?? 0)
       if (!branch) return false
       const field = condition.field ?? ""
       const cleanPath = field.startsWith("response.") ? field.slice(9) : field
       const actual = this.getNestedValue(branch, cleanPath)
-      const expected = this.substituteVariables(String(condition.value ?? ""))
+      const expected = substitute(String(condition.value ?? ""))
       try {
         return this.compareValues(actual, condition.operator ?? "equals", expected)
       } catch {
@@ -1309,162 +1411,145 @@ export class WorkflowExecutor {
     }
 
     const logic = config["conditionLogic"] === "AND" ? "AND" : "OR"
-    const outcomes = conditions.map(outcome)
-    const passed = logic === "AND" ? outcomes.every(Boolean) : outcomes.some(Boolean)
+    // every/some stop at the first condition that decides the gate.
+    const passed = logic === "AND" ? conditions.every(outcome) : conditions.some(outcome)
     if (!passed) {
       throw new Error(`Conditional merge gate not satisfied (${logic}): branch conditions did not match`)
     }
   }
 
-  private findDataProducingAncestor(nodeId: string, edges: readonly WorkflowEdge[]): string {
+  /**
+   * Walk up single-predecessor chains from `nodeId` to the nearest http-request
+   * result. Stops where the chain forks, starts, or loops back on itself, and
+   * returns the node it stopped on.
+   */
+  private findDataProducingAncestor(nodeId: string): string {
     const visited = new Set<string>()
-    const visit = (id: string): string => {
-      if (visited.has(id)) return id
+    let id = nodeId
+    while (!visited.has(id)) {
       visited.add(id)
-      const result = this.results.get(id)
-      if (result && result.type === "http-request") return id
-      const incoming = edges.filter((e) => e.target === id)
-      if (incoming.length === 0) return id
-      if (incoming.length === 1) return visit(incoming[0]!.source)
-      return id
-    }
-    return visit(nodeId)
+      if (this.results.get(id)?.type === "http-request") return id
+      const sources = this.incomingSources.get(id)
+      if (sources?.length !== 1) return id
+      id = sources[0]!
+    }
+    return id
   }
 
   // -------------------- Template substitution --------------------
 
-  private substituteVariables(text: string, options: { allowSecrets?: boolean } = {}): string {
+  private substituteVariables(
+    text: string,
+    options: { allowSecrets?: boolean; memo?: TemplateMemo } = {},
+  ): string {
+    // Static URLs, headers and bodies are the common case; skip the template scan.
+    if (!text.includes("{{")) return text
     const allowSecrets = options.allowSecrets ?? true
 
-    return text.replace(/\{\{([^}]+)\}\}/g, (match, rawPath: string) => {
-      const varPath = rawPath.trim()
-
-      // Function call
-      const funcMatch = varPath.match(/^([a-zA-Z_][a-zA-Z0-9_]*)\((.*)\)$/)
-      if (funcMatch) {
-        const funcName = funcMatch[1]!
-        const params = funcMatch[2]!.trim()
-        const func = this.deps.functions.getFunction(funcName)
-        if (func) {
-          try {
-            const paramList = params
-              ? params.split(",").map((p) => p.trim().replace(/^["']|["']$/g, ""))
-              : []
-            return String(func(...paramList))
-          } catch {
-            return match
-          }
-        }
-      }
-
-      // Secrets
-      if (varPath.startsWith("secrets.")) {
-        if (!allowSecrets) {
-          throw new Error("Secret substitution not allowed in URL/query/path contexts")
-        }
-        const secretName = varPath.slice(8)
-        const value = this.deps.secrets?.[secretName]
-        return value !== undefined ? value : match
+    const parts = compileTemplate(text)
+    // A body that repeats a token or base URL resolves each distinct
+    // expression once; callers rendering several fields pass one memo for all
+    // of them. Function calls stay per-occurrence so every {{uuid()}} gets a
+    // fresh value.
+    const memo = options.memo ?? (parts.length > 3 ? new Map<string, string>() : undefined)
+    let output = parts[0]!
+    for (let i = 1; i < parts.length; i += 2) {
+      const rawPath = parts[i]!
+      let value = memo?.get(rawPath)
+      if (value === undefined) {
+        value = this.resolveTemplateExpression(rawPath, allowSecrets)
+        if (memo && !rawPath.trimEnd().endsWith(")")) memo.set(rawPath, value)
       }
+      output += value + parts[i + 1]!
+    }
+    return output
+  }
 
-      // Environment variables
-      if (varPath.startsWith("env.")) {
-        const pathParts = varPath.slice(4).split(".")
-        let value: unknown = this.environmentVariables
-        for (const part of pathParts) {
-          if (typeof value === "object" && value !== null) {
-            value = (value as Record<string, unknown>)[part]
-          } else {
-            return match
-          }
+  /** The value of one `{{ … }}` expression, or the expression itself when it does not resolve. */
+  private resolveTemplateExpression(rawPath: string, allowSecrets: boolean): string {
+    const match = `{{${rawPath}}}`
+    const varPath = rawPath.trim()
+
+    // Function call; only expressions ending in ")" can be one.
+    const funcMatch = varPath.endsWith(")") ? varPath.match(FUNCTION_CALL_PATTERN) : null
+    if (funcMatch) {
+      const funcName = funcMatch[1]!
+      const params = funcMatch[2]!.trim()
+      const func = this.deps.functions.getFunction(funcName)
+      if (func) {
+        const paramList = params ? splitArguments(params) : []
+        // Only the function itself can throw, on arguments it does not expect.
+        try {
+          return String(func(...paramList))
+        } catch {
+          return match
         }
-        return value !== undefined && value !== null ? String(value) : match
       }
+    }
 
-      // Workflow variables
-      if (varPath.startsWith("variables.")) {
-        const pathParts = varPath.slice(10).split(".")
-        let value: unknown = this.workflowVariables
-        for (const part of pathParts) {
-          if (typeof value === "object" && value !== null) {
-            value = (value as Record<string, unknown>)[part]
-          } else {
-            return match
-          }
-        }
-        return value !== undefined && value !== null ? String(value) : match
+    // Secrets
+    if (varPath.startsWith("secrets.")) {
+      if (!allowSecrets) {
+        throw new Error("Secret substitution not allowed in URL/query/path contexts")
       }
-
-      // Previous results
-      if (varPath.startsWith("prev")) {
-        const indexMatch = varPath.match(/^prev\[(\d+)\]\.(.+)$/)
-        if (indexMatch) {
-          const branchIndex = Number.parseInt(indexMatch[1]!, 10)
-          const pathAfterIndex = indexMatch[2]!
-
-          if (this.currentBranchContext.length > 0) {
-            if (branchIndex >= 0 && branchIndex < this.currentBranchContext.length) {
-              const entry = this.currentBranchContext[branchIndex]!
-              const [, prevResult] = entry
-              const pathParts = pathAfterIndex.split(".")
-              return this.resolveDottedPath(prevResult, pathParts, match)
-            }
-            return match
-          }
-
-          const resultsList = [...this.results.values()]
-          if (branchIndex >= 0 && branchIndex < resultsList.length) {
-            const prevResult = resultsList[branchIndex]!
-            const pathParts = pathAfterIndex.split(".")
-            return this.resolveDottedPath(prevResult, pathParts, match)
+      const secretName = varPath.slice(8)
+      const value = this.deps.secrets?.[secretName]
+      return value !== undefined ? value : match
+    }
+
+    // Environment and workflow variables: the same path walk over a different root.
+    const dot = varPath.indexOf(".")
+    const head = dot === -1 ? varPath : varPath.slice(0, dot)
+    const scope =
+      dot === -1 ? undefined
+      : head === "env" ? this.environmentVariables
+      : head === "variables" ? this.workflowVariables
+      : undefined
+    if (scope) {
+      return this.resolveDottedPath(scope, compilePath(varPath.slice(dot + 1)), match)
+    }
+
+    // Previous results
+    if (varPath.startsWith("prev")) {
+      const indexMatch = varPath.match(PREV_INDEX_PATTERN)
+      if (indexMatch) {
+        const branchIndex = Number.parseInt(indexMatch[1]!, 10)
+        const pathAfterIndex = indexMatch[2]!
+
+        if (this.currentBranchContext.length > 0) {
+          if (branchIndex >= 0 && branchIndex < this.currentBranchContext.length) {
+            const entry = this.currentBranchContext[branchIndex]!
+            const [, prevResult] = entry
+            return this.resolveDottedPath(prevResult, compilePath(pathAfterIndex), match)
           }
           return match
         }
 
-        if (this.results.size > 0) {
-          const prevResult = [...this.results.values()].pop()!
-          const pathParts = varPath.slice(5).split(".")
-          return this.resolveDottedPath(prevResult, pathParts, match)
-        }
-        return match
+        const prevNodeId = this.resultOrder[branchIndex]
+        const prevResult = prevNodeId === undefined ? undefined : this.results.get(prevNodeId)
+        return prevResult ? this.resolveDottedPath(prevResult, compilePath(pathAfterIndex), match) : match
       }
 
-      // Direct node ID access
-      const firstPart = varPath.split(".")[0]!
-      const nodeResult = this.results.get(firstPart)
-      if (nodeResult) {
-        const pathParts = varPath.split(".").slice(1)
-        return this.resolveDottedPath(nodeResult, pathParts, match)
+      const lastNodeId = this.resultOrder[this.resultOrder.length - 1]
+      const prevResult = lastNodeId === undefined ? undefined : this.results.get(lastNodeId)
+      if (prevResult) {
+        return this.resolveDottedPath(prevResult, compilePath(varPath.slice(5)), match)
       }
-
       return match
-    })
-  }
+    }
 
-  private resolveDottedPath(value: unknown, pathParts: string[], fallback: string): string {
-    let current: unknown = value
-    for (const part of pathParts) {
-      const arrayMatch = part.match(/^([a-zA-Z_][a-zA-Z0-9_]*)\[(\d+)\]$/)
-      if (arrayMatch) {
-        const key = arrayMatch[1]!
-        const index = Number.parseInt(arrayMatch[2]!, 10)
-        if (typeof current === "object" && current !== null && key in current) {
-          current = (current as Record<string, unknown>)[key]
-          if (Array.isArray(current) && index >= 0 && index < current.length) {
-            current = current[index]
-          } else {
-            return fallback
-          }
-        } else {
-          return fallback
-        }
-      } else if (typeof current === "object" && current !== null) {
-        current = (current as Record<string, unknown>)[part]
-      } else {
-        return fallback
-      }
+    // Direct node ID access
+    const nodeResult = this.results.get(head)
+    if (nodeResult) {
+      return this.resolveDottedPath(nodeResult, dot === -1 ? [] : compilePath(varPath.slice(dot + 1)), match)
     }
-    return current !== undefined && current !== null ? String(current) : fallback
+
+    return match
+  }
+
+  private resolveDottedPath(value: unknown, path: CompiledPath, fallback: string): string {
+    const resolved = walkPath(value, path)
+    return resolved !== undefined && resolved !== null ? String(resolved) : fallback
   }
 
   // -------------------- Extraction --------------------
@@ -1475,13 +1560,16 @@ export class WorkflowExecutor {
     response: NodeResult,
   ): ExtractorOutcome[] {
     const outcomes: ExtractorOutcome[] = []
+    const extracted: Record<string, unknown> = {}
+    let extractedAny = false
     for (const [varName, varPath] of Object.entries(extractors)) {
       try {
         const resolution = this.resolveExtractorValue(response, varPath)
         const value = resolution.value
         const matched = resolution.failureReason === null
         if (matched) {
-          this.workflowVariables[varName] = value
+          extracted[varName] = value
+          extractedAny = true
         }
         outcomes.push({
           producerNodeId,
@@ -1502,6 +1590,10 @@ export class WorkflowExecutor {
         })
       }
     }
+    if (extractedAny) {
+      Object.assign(this.workflowVariables, extracted)
+      this.variablesChanged()
+    }
     return outcomes
   }
 
@@ -1510,25 +1602,19 @@ export class WorkflowExecutor {
     path: string,
   ): { readonly value: unknown; readonly failureReason: "path-missing" | "type-mismatch" | null } {
     if (obj === null || obj === undefined || !path) return { value: undefined, failureReason: "path-missing" }
-    const parts = path.split(".")
+    const parts = compilePath(path)
     let value: unknown = obj
     for (let partIndex = 0; partIndex < parts.length; partIndex++) {
-      const part = parts[partIndex]!
-      const arrayMatch = part.match(/^([a-zA-Z_][a-zA-Z0-9_]*)\[(\d+)\]$/)
       if (typeof value !== "object" || value === null) {
         return { value: undefined, failureReason: "type-mismatch" }
       }
-      if (arrayMatch) {
-        const key = arrayMatch[1]!
-        if (!(key in value)) return { value: undefined, failureReason: "path-missing" }
-        const candidate = (value as Record<string, unknown>)[key]
-        if (!Array.isArray(candidate)) return { value: undefined, failureReason: "type-mismatch" }
-        const arrayIndex = Number.parseInt(arrayMatch[2]!, 10)
-        if (arrayIndex >= candidate.length) return { value: undefined, failureReason: "path-missing" }
-        value = candidate[arrayIndex]
-      } else {
-        if (!(part in value)) return { value: undefined, failureReason: "path-missing" }
-        value = (value as Record<string, unknown>)[part]
+      const { key, index } = parts[partIndex]!
+      if (!(key in value)) return { value: undefined, failureReason: "path-missing" }
+      value = (value as Record<string, unknown>)[key]
+      if (index !== undefined) {
+        if (!Array.isArray(value)) return { value: undefined, failureReason: "type-mismatch" }
+        if (index >= value.length) return { value: undefined, failureReason: "path-missing" }
+        value = value[index]
       }
       if (value === undefined) return { value: undefined, failureReason: "path-missing" }
       if (value === null && partIndex < parts.length - 1) {
@@ -1540,33 +1626,7 @@ export class WorkflowExecutor {
 
   private getNestedValue(obj: unknown, path: string): unknown {
     if (!obj || !path) return undefined
-    const parts = path.split(".")
-    let value: unknown = obj
-    for (let index = 0; index < parts.length; index++) {
-      const part = parts[index]!
-      const arrayMatch = part.match(/^([a-zA-Z_][a-zA-Z0-9_]*)\[(\d+)\]$/)
-      if (arrayMatch) {
-        const key = arrayMatch[1]!
-        const index = Number.parseInt(arrayMatch[2]!, 10)
-        if (typeof value === "object" && value !== null && key in value) {
-          value = (value as Record<string, unknown>)[key]
-          if (Array.isArray(value) && index >= 0 && index < value.length) {
-            value = value[index]
-          } else {
-            return undefined
-          }
-        } else {
-          return undefined
-        }
-      } else if (typeof value === "object" && value !== null) {
-        value = (value as Record<string, unknown>)[part]
-      } else {
-        return undefined
-      }
-      if (value === undefined) return undefined
-      if (value === null && index < parts.length - 1) return undefined
-    }
-    return value
+    return walkPath(obj, compilePath(path))
   }
 
   // -------------------- Key-value field normalization --------------------
@@ -1579,6 +1639,7 @@ export class WorkflowExecutor {
           readonly active?: boolean
         }>
       | undefined,
+    memo: TemplateMemo,
   ): Record<string, string> {
     const result: Record<string, string> = {}
     if (!pairs) return result
@@ -1587,7 +1648,7 @@ export class WorkflowExecutor {
       if (entry.active === false) continue
       const key = entry.key
       if (key === undefined || key === null || key === "") continue
-      result[String(key)] = this.substituteVariables(String(entry.value ?? ""))
+      result[String(key)] = this.substituteVariables(String(entry.value ?? ""), { memo })
     }
     return result
   }
@@ -1599,17 +1660,18 @@ export class WorkflowExecutor {
     auth: HttpAuthConfig | undefined,
     headers: Record<string, string>,
     queryParams: Record<string, string>,
+    memo: TemplateMemo,
   ): void {
     if (!auth || !auth.type || auth.type === "none") return
     if (auth.type === "bearer" && auth.bearer?.token) {
-      headers["Authorization"] = `Bearer ${this.substituteVariables(auth.bearer.token)}`
+      headers["Authorization"] = `Bearer ${this.substituteVariables(auth.bearer.token, { memo })}`
     } else if (auth.type === "basic" && auth.basic) {
-      const username = this.substituteVariables(auth.basic.username ?? "")
-      const password = this.substituteVariables(auth.basic.password ?? "")
+      const username = this.substituteVariables(auth.basic.username ?? "", { memo })
+      const password = this.substituteVariables(auth.basic.password ?? "", { memo })
       headers["Authorization"] = `Basic ${Buffer.from(`${username}:${password}`).toString("base64")}`
     } else if (auth.type === "apiKey" && auth.apiKey?.key) {
-      const key = this.substituteVariables(auth.apiKey.key)
-      const value = this.substituteVariables(auth.apiKey.value ?? "")
+      const key = this.substituteVariables(auth.apiKey.key, { memo })
+      const value = this.substituteVariables(auth.apiKey.value ?? "", { memo })
       if (auth.apiKey.addTo === "query") {
         queryParams[key] = value
       } else {
@@ -1626,6 +1688,7 @@ export class WorkflowExecutor {
     formDataEntries: readonly FormDataEntryLike[] | undefined,
     urlEncodedEntries: ReadonlyArray<{ readonly key: string; readonly value: string; readonly active?: boolean }> | undefined,
     fileUploads: readonly FileUploadLike[] | undefined,
+    memo: TemplateMemo,
   ): Promise<string | Buffer | UndiciFormData | undefined> {
     switch (bodyType) {
       case "none":
@@ -1637,12 +1700,13 @@ export class WorkflowExecutor {
           if (entry.active === false || !entry.key) continue
           if (entry.type === "file") {
             // ponytail: form-data file rows store a local file path in `value`
-            // (see FormDataRows "file ref" placeholder) — read it directly.
-            const buffer = await this.readFileUploadContent({ type: "path", value: entry.value })
+            // (see FormDataRows "file ref" placeholder). A file-backed Blob is
+            // streamed from disk as the body is sent instead of being read
+            // into memory and copied up front.
             const fileName = entry.value.split(/[\\/]/).pop() || entry.key
-            form.append(entry.key, new Blob([new Uint8Array(buffer)]), fileName)
+            form.append(entry.key, await openFileBlob(entry.value), fileName)
           } else {
-            form.append(entry.key, this.substituteVariables(entry.value ?? ""))
+            form.append(entry.key, this.substituteVariables(entry.value ?? "", { memo }))
           }
         }
         return form
@@ -1652,7 +1716,7 @@ export class WorkflowExecutor {
         const params = new URLSearchParams()
         for (const entry of urlEncodedEntries ?? []) {
           if (entry.active === false || !entry.key) continue
-          params.append(entry.key, this.substituteVariables(entry.value ?? ""))
+          params.append(entry.key, this.substituteVariables(entry.value ?? "", { memo }))
         }
         if (!headers["Content-Type"] && !headers["content-type"]) {
           headers["Content-Type"] = "application/x-www-form-urlencoded"
@@ -1663,7 +1727,7 @@ export class WorkflowExecutor {
       case "binary": {
         const upload = fileUploads?.[0]
         if (!upload) return undefined
-        const buffer = await this.readFileUploadContent(upload)
+        const buffer = await this.readFileUploadContent(upload, memo)
         if (!headers["Content-Type"] && !headers["content-type"] && upload.mimeType) {
           headers["Content-Type"] = upload.mimeType
         }
@@ -1671,14 +1735,14 @@ export class WorkflowExecutor {
       }
 
       case "raw":
-        return typeof body === "string" ? this.substituteVariables(body) : undefined
+        return typeof body === "string" ? this.substituteVariables(body, { memo }) : undefined
 
       case "json":
       default: {
         // Back-compat default for nodes saved before `bodyType` existed.
         if (body === undefined || body === null) return undefined
-        if (typeof body === "string") return this.substituteVariables(body)
-        const json = this.substituteVariables(JSON.stringify(body))
+        if (typeof body === "string") return this.substituteVariables(body, { memo })
+        const json = this.substituteVariables(JSON.stringify(body), { memo })
         if (!headers["Content-Type"] && !headers["content-type"]) {
           headers["Content-Type"] = "application/json"
         }
@@ -1688,10 +1752,17 @@ export class WorkflowExecutor {
   }
 
   /** Resolve a file upload's bytes per its `type` — base64-decoded, read from disk, or a resolved variable. */
-  private async readFileUploadContent(upload: { readonly type: string; readonly value: string }): Promise<Buffer> {
+  private async readFileUploadContent(
+    upload: { readonly type: string; readonly value: string },
+    memo: TemplateMemo,
+  ): Promise<Buffer> {
     switch (upload.type) {
-      case "base64":
-        return Buffer.from(upload.value, "base64")
+      case "base64": {
+        // The upload panel stores a data URL; decode only the payload after
+        // its `data:<mime>;base64,` header, without splitting the whole string.
+        const payloadStart = upload.value.startsWith("data:") ? upload.value.indexOf(",") + 1 : 0
+        return Buffer.from(payloadStart > 0 ? upload.value.slice(payloadStart) : upload.value, "base64")
+      }
       case "path":
         // ponytail: desktop single-user trust model — the path comes from the
         // user's own saved workflow config, same trust boundary safe_http.ts
@@ -1699,7 +1770,7 @@ export class WorkflowExecutor {
         return fs.readFile(upload.value)
       case "variable":
       default:
-        return Buffer.from(this.substituteVariables(upload.value ?? ""), "utf-8")
+        return Buffer.from(this.substituteVariables(upload.value ?? "", { memo }), "utf-8")
     }
   }
 
@@ -1717,7 +1788,7 @@ export class WorkflowExecutor {
         runId: this.activeRunId,
         nodeId,
         status,
-        variables: { ...this.workflowVariables },
+        variables: (this.variablesSnapshot ??= { ...this.workflowVariables }),
         ...(status === "failed" && error ? { error } : {}),
         ...(status === "failed" && message ? { message } : {}),
         ...(status === "failed" && statusCode !== undefined ? { statusCode } : {}),
@@ -1725,6 +1796,10 @@ export class WorkflowExecutor {
     }
   }
 
+  private variablesChanged(): void {
+    this.variablesSnapshot = null
+  }
+
   // -------------------- Output building --------------------
 
   private buildOutput(
@@ -1854,6 +1929,181 @@ function jsonValueType(value: unknown): JsonValueType | null {
   }
 }
 
+/** `value` as a number for comparison, or null when it has none. */
+function toComparableNumber(value: unknown): number | null {
+  if (value === null || value === undefined) return null
+  try {
+    const n = Number(value)
+    return Number.isNaN(n) ? null : n
+  } catch {
+    // Symbols (and objects whose valueOf throws) have no numeric form.
+    return null
+  }
+}
+
+function collectionSize(value: object): number {
+  return Array.isArray(value) ? value.length : Object.keys(value).length
+}
+
+function toComparableString(value: unknown): string {
+  return value !== null && value !== undefined ? String(value) : ""
+}
+
+function httpStatusBucket(statusCode: number): string {
+  const hundreds = Math.floor(statusCode / 100)
+  return HTTP_STATUS_BUCKETS[Math.min(hundreds, HTTP_STATUS_BUCKETS.length - 1)] ?? "unknown"
+}
+
+/**
+ * Resolved `{{ … }}` expressions keyed by their raw text, shared by the
+ * fields of one request. Only for secret-allowed rendering.
+ */
+type TemplateMemo = Map<string, string>
+
+/**
+ * Literal text and `{{ … }}` expressions of a template, alternating: even
+ * indexes are literals, odd ones an expression's raw text.
+ */
+type CompiledTemplate = readonly string[]
+
+const compiledTemplates = new Map<string, CompiledTemplate>()
+
+/**
+ * Split a template once and reuse the pieces. Node configs are re-rendered on
+ * every run and for every field, so the same strings come back again and again.
+ */
+function compileTemplate(text: string): CompiledTemplate {
+  let compiled = compiledTemplates.get(text)
+  if (!compiled) {
+    if (compiledTemplates.size >= TEMPLATE_CACHE_LIMIT) compiledTemplates.clear()
+    compiled = text.split(TEMPLATE_PATTERN)
+    compiledTemplates.set(text, compiled)
+  }
+  return compiled
+}
+
+/**
+ * Split a function's argument list on the commas outside quotes, so
+ * `randomChoice("a,b,c")` receives one argument. Each argument is sliced out
+ * whole rather than built up a character at a time.
+ */
+function splitArguments(params: string): string[] {
+  const args: string[] = []
+  let start = 0
+  let quote = ""
+  for (let i = 0; i < params.length; i++) {
+    const char = params[i]
+    if (quote) {
+      if (char === quote) quote = ""
+    } else if (char === ",") {
+      args.push(params.slice(start, i).trim().replace(ARGUMENT_QUOTES_PATTERN, ""))
+      start = i + 1
+    } else if ((char === '"' || char === "'") && params.slice(start, i).trim() === "") {
+      quote = char
+    }
+  }
+  args.push(params.slice(start).trim().replace(ARGUMENT_QUOTES_PATTERN, ""))
+  return args
+}
+
+/**
+ * A file-backed Blob for `filePath`. Stat first: openAsBlob reports a missing
+ * path without the path or errno, and accepts a directory that then fails
+ * mid-send.
+ */
+async function openFileBlob(filePath: string): Promise<Blob> {
+  const stats = await fs.stat(filePath)
+  if (!stats.isFile()) throw new Error(`Not a regular file: '${filePath}'`)
+  return openAsBlob(filePath)
+}
+
+/** One dotted path segment: a property, and for `items[2]` an array index into it. */
+interface PathSegment {
+  readonly key: string
+  readonly index?: number
+}
+
+type CompiledPath = readonly PathSegment[]
+
+const ARRAY_SEGMENT_PATTERN = /^([a-zA-Z_][a-zA-Z0-9_]*)\[(\d+)\]$/
+const compiledPaths = new Map<string, CompiledPath>()
+
+/**
+ * Tokenize a dotted path once and reuse the segments. Merge conditions read
+ * the same field from every branch, and templates and extractors repeat their
+ * paths run after run.
+ */
+function compilePath(path: string): CompiledPath {
+  let compiled = compiledPaths.get(path)
+  if (!compiled) {
+    if (compiledPaths.size >= TEMPLATE_CACHE_LIMIT) compiledPaths.clear()
+    compiled = path.split(".").map((part): PathSegment => {
+      // Plain keys are the norm; only `name[i]` needs the pattern.
+      const arrayMatch = part.endsWith("]") ? part.match(ARRAY_SEGMENT_PATTERN) : null
+      return arrayMatch ? { key: arrayMatch[1]!, index: Number.parseInt(arrayMatch[2]!, 10) } : { key: part }
+    })
+    compiledPaths.set(path, compiled)
+  }
+  return compiled
+}
+
+/**
+ * Follow compiled path segments down from `value`. Undefined as soon as a
+ * segment misses; a null is only returned as the final value. Shared by
+ * template paths and merge-condition fields.
+ */
+function walkPath(value: unknown, parts: CompiledPath): unknown {
+  let current = value
+  for (let i = 0; i < parts.length; i++) {
+    if (typeof current !== "object" || current === null) return undefined
+    const { key, index } = parts[i]!
+    if (index !== undefined) {
+      // One property read; a missing key and a non-array value both end here.
+      const candidate = (current as Record<string, unknown>)[key]
+      if (!Array.isArray(candidate) || index >= candidate.length) return undefined
+      current = candidate[index]
+    } else {
+      current = (current as Record<string, unknown>)[key]
+    }
+    if (current === undefined) return undefined
+    if (current === null && i < parts.length - 1) return undefined
+  }
+  return current
+}
+
+/**
+ * The response body as JSON when it is JSON, else the raw text. A JSON text can
+ * only start with one of a handful of characters, so HTML and plain-text bodies
+ * are returned without paying for a parse that is bound to throw.
+ */
+function parseResponseBody(text: string): unknown {
+  const first = text.trimStart().charAt(0)
+  if (!first || !JSON_START_CHARS.includes(first)) return text
+  try {
+    return JSON.parse(text)
+  } catch {
+    return text
+  }
+}
+
+/**
+ * Name → value for each Set-Cookie line. Only the leading `name=value` pair is
+ * a cookie; everything after the first `;` (Path, Expires, HttpOnly, …) is an
+ * attribute of it. Taking the lines unjoined means an Expires date's comma
+ * never has to be told apart from the comma between two cookies.
+ */
+function parseSetCookies(lines: readonly string[]): Record<string, string> {
+  const cookies: Record<string, string> = {}
+  for (const line of lines) {
+    const end = line.indexOf(";")
+    const pair = end === -1 ? line : line.slice(0, end)
+    const eq = pair.indexOf("=")
+    if (eq === -1) continue
+    cookies[pair.slice(0, eq).trim()] = pair.slice(eq + 1).trim()
+  }
+  return cookies
+}
+
 /** Collect every {{secrets.NAME}} referenced by a node's config (names only). */
 function collectSecretRefs(config: Record<string, unknown> | undefined): readonly string[] {
   if (!config) return []
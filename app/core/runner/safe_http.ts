@@ -49,6 +49,8 @@ const DEV_ALLOWED_HOSTS = new Set(["host.docker.internal"])
 
 const ALLOWED_SCHEMES = new Set(["http", "https"])
 export const MAX_REDIRECT_HOPS = 5
+/** Pinned dispatchers kept alive for connection reuse; the least recently used one is closed past this. */
+const PINNED_DISPATCHER_LIMIT = 32
 
 export class SafeUrlError extends Error {
   public override readonly name = "SafeUrlError"
@@ -83,6 +85,12 @@ export class SafeHttp {
   private readonly fetchImpl: typeof fetch
   private readonly dnsLookup: SafeHttpOptions["dnsLookup"]
   private readonly timeoutMs: number
+  /**
+   * Pinned dispatchers by `ip|tls-verify`, least recently used first. A dispatcher
+   * only ever dials its own IP, so reusing one keeps the rebinding guard while
+   * letting consecutive requests to a host share kept-alive TCP/TLS connections.
+   */
+  private readonly pinnedDispatchers = new Map<string, Dispatcher>()
 
   public constructor(opts: SafeHttpOptions = {}) {
     this.allowLoopback = opts.allowLoopback ?? true
@@ -201,7 +209,7 @@ export class SafeHttp {
       // dispatcher `lookup`, without touching the request URL — for HTTPS,
       // SNI and certificate hostname verification must stay on the original
       // hostname or normal public certs fail to validate against the IP.
-      const dispatcher = pinnedIp ? buildPinnedDispatcher(pinnedIp, rejectUnauthorized) : undefined
+      const dispatcher = pinnedIp ? this.pinnedDispatcher(pinnedIp, rejectUnauthorized) : undefined
       const response = await this.fetchImpl(currentUrl, dispatcher ? { ...lastInit, dispatcher } : lastInit)
       if (response.status < 300 || response.status >= 400) return response
       if (!followRedirects) return response
@@ -230,7 +238,8 @@ export class SafeHttp {
    * compromised endpoint can otherwise return an unbounded or slow-trickling
    * body and exhaust memory/CPU; this stops pulling bytes off the stream (and
    * cancels the underlying connection) the moment the cap is hit instead of
-   * buffering the whole thing via `response.text()`.
+   * buffering the whole thing via `response.text()`. Chunks are decoded as
+   * they arrive, so the body is never held as bytes and as a string at once.
    */
   public async readTextCapped(response: Response, maxBytes: number): Promise<{ text: string; truncated: boolean }> {
     const contentLength = Number(response.headers.get("content-length") ?? "")
@@ -245,7 +254,8 @@ export class SafeHttp {
       return text.length > maxBytes ? { text: text.slice(0, maxBytes), truncated: true } : { text, truncated: false }
     }
 
-    const chunks: Buffer[] = []
+    const decoder = new TextDecoder("utf-8")
+    let text = ""
     let received = 0
     let truncated = false
     for (;;) {
@@ -255,17 +265,35 @@ export class SafeHttp {
       if (received > maxBytes) {
         truncated = true
         const overflow = received - maxBytes
-        chunks.push(Buffer.from(value.buffer, value.byteOffset, value.byteLength - overflow))
+        text += decoder.decode(value.subarray(0, value.byteLength - overflow), { stream: true })
         await reader.cancel()
         break
       }
-      chunks.push(Buffer.from(value.buffer, value.byteOffset, value.byteLength))
+      text += decoder.decode(value, { stream: true })
     }
-    return { text: Buffer.concat(chunks).toString("utf-8"), truncated }
+    return { text: text + decoder.decode(), truncated }
   }
 
   // -------------------- Internals --------------------
 
+  private pinnedDispatcher(ip: string, rejectUnauthorized: boolean): Dispatcher {
+    const key = `${ip}|${rejectUnauthorized}`
+    let dispatcher = this.pinnedDispatchers.get(key)
+    if (dispatcher) {
+      this.pinnedDispatchers.delete(key)
+    } else {
+      dispatcher = buildPinnedDispatcher(ip, rejectUnauthorized)
+      if (this.pinnedDispatchers.size >= PINNED_DISPATCHER_LIMIT) {
+        const [oldestKey, oldest] = this.pinnedDispatchers.entries().next().value!
+        this.pinnedDispatchers.delete(oldestKey)
+        // Graceful: requests still running on it finish before its sockets close.
+        void oldest.close()
+      }
+    }
+    this.pinnedDispatchers.set(key, dispatcher)
+    return dispatcher
+  }
+
   private isBlockedIp(address: string, family: 4 | 6): boolean {
     const type: AddressType = family === 6 ? "ipv6" : "ipv4"
     if (this.allowLoopback && this.loopbackList.check(address, type)) return false
@@ -306,7 +334,7 @@ function stripIpv6Brackets(hostname: string): string {
 }
 
 /**
- * Build a one-shot undici dispatcher whose connector resolves every hostname
+ * Build an undici dispatcher whose connector resolves every hostname
  * to the given (already-validated) IP, closing the DNS-rebinding TOCTOU gap
  * without rewriting the request URL — so TLS SNI/cert checks and the Host
  * header stay on the original hostname.
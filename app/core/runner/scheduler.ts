@@ -14,6 +14,12 @@ import { NotFoundError } from "../ipc/errors"
 import { sanitizeVariablesForExport } from "../services/secret_utils"
 
 const DEFAULT_CONCURRENCY_CAP = 4
+/** Debounce for the write-behind node-status buffer; statuses landing within it share one write. */
+const NODE_STATUS_FLUSH_DELAY_MS = 25
+/** A wide fan-out flushes as soon as this many nodes have a pending status, without waiting out the debounce. */
+const NODE_STATUS_FLUSH_BATCH = 32
+/** A `{{secrets.NAME}}` reference in a node config string; whitespace inside the braces is allowed. */
+const SECRET_REFERENCE_PATTERN = /\{\{\s*secrets\.([A-Za-z_][A-Za-z0-9_]*)\s*\}\}/g
 
 export interface SchedulerDeps {
   readonly runs: RunRepository
@@ -51,12 +57,23 @@ export interface EnqueueRequest {
  *
  * Cancellation: per-run `AbortController`; the executor checks between nodes.
  * Progress: the executor's `node.completed` events are proxied to the renderer
- * via the `emitProgress` dep AND written to the DB via `appendNodeStatus`
- * (field-level, decision #6b).
+ * via the `emitProgress` dep AND written to the DB via `appendNodeStatuses`
+ * (field-level, decision #6b). DB writes go through a per-run write-behind buffer
+ * flushed after {@link NODE_STATUS_FLUSH_DELAY_MS}, once {@link NODE_STATUS_FLUSH_BATCH}
+ * nodes are pending, and before any terminal write,
+ * so a run costs a handful of UPDATEs instead of two per node.
  */
 export class RunScheduler {
   private readonly activeRuns = new Map<string, AbortController>()
   private readonly queue: string[] = []
+  private readonly pendingNodeStatuses = new Map<string, Map<string, JsonValue>>()
+  private readonly nodeStatusFlushTimers = new Map<string, ReturnType<typeof setTimeout>>()
+  /**
+   * Redacted copy of each variables snapshot the executor hands out. The
+   * executor reuses one snapshot object until a variable changes, so most
+   * node events skip the sanitizer walk entirely.
+   */
+  private readonly sanitizedSnapshots = new WeakMap<object, Record<string, JsonValue>>()
   private draining = false
 
   public constructor(private readonly deps: SchedulerDeps) {}
@@ -98,7 +115,7 @@ export class RunScheduler {
     const idx = this.queue.indexOf(runId)
     if (idx >= 0) {
       this.queue.splice(idx, 1)
-      this.deps.runs.updateStatus(runId, "cancelled")
+      this.deps.runs.setStatus(runId, "cancelled")
       // A queued run never reached executeRun, so nothing else will publish its
       // terminal event — do it here or a subscriber waits forever (Phase 6).
       this.emitFinished(runId, "cancelled")
@@ -110,7 +127,7 @@ export class RunScheduler {
   public reconcileOnStartup(): number {
     const nonTerminal = this.deps.runs.listNonTerminal()
     for (const run of nonTerminal) {
-      this.deps.runs.updateStatus(run.runId, "interrupted")
+      this.deps.runs.setStatus(run.runId, "interrupted")
     }
     return nonTerminal.length
   }
@@ -124,7 +141,8 @@ export class RunScheduler {
       await new Promise((resolve) => setTimeout(resolve, 100))
     }
     for (const runId of this.activeRuns.keys()) {
-      this.deps.runs.updateStatus(runId, "interrupted")
+      this.flushNodeStatuses(runId)
+      this.deps.runs.setStatus(runId, "interrupted")
       // The abort above may not have driven executeRun's catch to a terminal
       // publish before the grace window closed — publish once here (the broker
       // dedups a later duplicate terminal).
@@ -133,7 +151,7 @@ export class RunScheduler {
     // Runs still queued never started; mark and publish a terminal so any
     // subscriber unwinds rather than hanging on a run that will never run.
     for (const runId of this.queue) {
-      this.deps.runs.updateStatus(runId, "interrupted")
+      this.deps.runs.setStatus(runId, "interrupted")
       this.emitFinished(runId, "interrupted")
     }
     this.queue.length = 0
@@ -156,7 +174,7 @@ export class RunScheduler {
   private async executeRun(runId: string): Promise<void> {
     const controller = new AbortController()
     this.activeRuns.set(runId, controller)
-    this.deps.runs.updateStatus(runId, "running")
+    this.deps.runs.setStatus(runId, "running")
     this.deps.emitProgress?.(runId, { kind: "run.started", runId })
 
     try {
@@ -220,6 +238,7 @@ export class RunScheduler {
         ...(run.resumeFromNodeIds ? { startNodeIds: run.resumeFromNodeIds } : {}),
       })
 
+      this.flushNodeStatuses(runId)
       const extractedVariables = sanitizeFinalVariables(output)
       const failureMessage = safeFailureMessage(output.failedNodes)
       this.deps.runs.updateExecutionEvidence(runId, {
@@ -230,15 +249,16 @@ export class RunScheduler {
       })
 
       const status: Run["status"] = output.status === "passed" ? "completed" : "failed"
-      this.deps.runs.updateStatus(
+      this.deps.runs.setStatus(
         runId,
         status,
         status === "failed" ? failureMessage ?? "Workflow execution failed" : undefined,
       )
       this.emitFinished(runId, status)
     } catch {
+      this.tryFlushNodeStatuses(runId)
       if (controller.signal.aborted) {
-        this.deps.runs.updateStatus(runId, "cancelled")
+        this.deps.runs.setStatus(runId, "cancelled")
         this.emitFinished(runId, "cancelled")
       } else {
         const existing = this.deps.runs.getById(runId)
@@ -250,10 +270,13 @@ export class RunScheduler {
             failureMessage: "Workflow execution failed",
           })
         }
-        this.deps.runs.updateStatus(runId, "failed", "Workflow execution failed")
+        this.deps.runs.setStatus(runId, "failed", "Workflow execution failed")
         this.emitFinished(runId, "failed")
       }
     } finally {
+      this.tryFlushNodeStatuses(runId)
+      // Whatever is still buffered could not be written; it goes with the run.
+      this.pendingNodeStatuses.delete(runId)
       this.activeRuns.delete(runId)
       void this.drain()
     }
@@ -279,24 +302,25 @@ export class RunScheduler {
     if (!resolver) return { resolvedSecrets: [] }
 
     const names = new Set<string>()
-    const pattern = /\{\{\s*secrets\.([A-Za-z_][A-Za-z0-9_]*)\s*\}\}/g
     for (const node of graph.nodes) {
-      const config = node.config
-      if (!config) continue
-      for (const value of collectStrings(config)) {
-        let m: RegExpExecArray | null
-        while ((m = pattern.exec(value)) !== null) {
-          names.add(m[1]!)
-        }
-      }
+      if (!node.config) continue
+      visitStrings(node.config, (value) => {
+        // Most config strings hold no template at all; skip the regex for them.
+        if (!value.includes("{{")) return
+        for (const match of value.matchAll(SECRET_REFERENCE_PATTERN)) names.add(match[1]!)
+      })
     }
     if (names.size === 0) return { resolvedSecrets: [] }
 
     const chain = { ...(environmentId ? { environmentId } : {}), workspaceId }
+    // Each name resolves independently; start them together so a run waits for
+    // the slowest lookup, not the sum of them.
+    const resolutions = await Promise.all(
+      [...names].map(async (name) => ({ name, ...(await resolver(name, chain)) })),
+    )
     const secrets: Record<string, string> = {}
     const resolvedSecrets: ResolvedSecretInfo[] = []
-    for (const name of names) {
-      const { plaintext, scopeType } = await resolver(name, chain)
+    for (const { name, plaintext, scopeType } of resolutions) {
       resolvedSecrets.push({ name, scopeType, resolved: plaintext !== null })
       if (plaintext !== null) secrets[name] = plaintext
     }
@@ -305,12 +329,16 @@ export class RunScheduler {
 
   private handleProgress(runId: string, event: RunEvent): void {
     // The executor only ever hands us node events; started/terminal events are
-    // emitted separately. Narrow so appendNodeStatus stays node-only.
+    // emitted separately. Narrow so the status buffer stays node-only.
     if (event.kind !== "node.status") return
     // A workflow can extract a token/password/api-key into a variable; redact
     // secret-looking keys/values the same way exports do before this snapshot
     // goes out over IPC and into run history (readable via runs.get/list, incl. MCP).
-    const sanitizedVariables = sanitizeVariablesForExport(event.variables as Record<string, JsonValue>)
+    let sanitizedVariables = this.sanitizedSnapshots.get(event.variables)
+    if (!sanitizedVariables) {
+      sanitizedVariables = sanitizeVariablesForExport(event.variables as Record<string, JsonValue>)
+      this.sanitizedSnapshots.set(event.variables, sanitizedVariables)
+    }
     const sanitizedError = event.error ? safeErrorClass(event.error) : undefined
     const sanitizedEvent: RunEvent = {
       ...event,
@@ -318,7 +346,7 @@ export class RunScheduler {
       ...(sanitizedError ? { error: sanitizedError } : {}),
     }
     this.deps.emitProgress?.(runId, sanitizedEvent)
-    this.deps.runs.appendNodeStatus(runId, event.nodeId, {
+    this.queueNodeStatus(runId, event.nodeId, {
       status: event.status,
       variables: sanitizedVariables,
       ...(sanitizedError ? { error: sanitizedError } : {}),
@@ -326,6 +354,50 @@ export class RunScheduler {
       ...(event.statusCode !== undefined ? { statusCode: event.statusCode } : {}),
     })
   }
+
+  /** Buffer a node's latest status entry; a later event for the same node replaces it. */
+  private queueNodeStatus(runId: string, nodeId: string, entry: JsonValue): void {
+    let pending = this.pendingNodeStatuses.get(runId)
+    if (!pending) {
+      pending = new Map()
+      this.pendingNodeStatuses.set(runId, pending)
+    }
+    pending.set(nodeId, entry)
+    if (pending.size >= NODE_STATUS_FLUSH_BATCH) {
+      this.flushNodeStatuses(runId)
+    } else if (!this.nodeStatusFlushTimers.has(runId)) {
+      this.nodeStatusFlushTimers.set(
+        runId,
+        setTimeout(() => this.tryFlushNodeStatuses(runId), NODE_STATUS_FLUSH_DELAY_MS),
+      )
+    }
+  }
+
+  /** Write a run's buffered statuses. On a failed write they stay buffered, so the next flush retries them. */
+  private flushNodeStatuses(runId: string): void {
+    const timer = this.nodeStatusFlushTimers.get(runId)
+    if (timer !== undefined) {
+      clearTimeout(timer)
+      this.nodeStatusFlushTimers.delete(runId)
+    }
+    const pending = this.pendingNodeStatuses.get(runId)
+    if (!pending) return
+    this.deps.runs.appendNodeStatuses(runId, pending)
+    this.pendingNodeStatuses.delete(runId)
+  }
+
+  /**
+   * {@link flushNodeStatuses} for callers a DB error must not escape: the
+   * debounce timer, where it would be an uncaught exception in the main
+   * process, and a run that is already failing or ending.
+   */
+  private tryFlushNodeStatuses(runId: string): void {
+    try {
+      this.flushNodeStatuses(runId)
+    } catch {
+      // Left buffered for the run's next flush.
+    }
+  }
 }
 
 function sanitizeFinalVariables(output: Awaited<ReturnType<WorkflowExecutor["executeWorkflow"]>>): Record<string, JsonValue> {
@@ -376,12 +448,13 @@ function safeErrorClass(error: string): string {
   return "Node execution failed"
 }
 
-/** Recursively collect every string value within a node config (mirrors Python _iter_config_values). */
-function collectStrings(obj: unknown): string[] {
-  if (typeof obj === "string") return [obj]
-  if (Array.isArray(obj)) return obj.flatMap(collectStrings)
-  if (obj !== null && typeof obj === "object") {
-    return Object.values(obj).flatMap(collectStrings)
+/** Call `visit` on every string value within a node config (mirrors Python _iter_config_values). */
+function visitStrings(obj: unknown, visit: (value: string) => void): void {
+  if (typeof obj === "string") {
+    visit(obj)
+  } else if (Array.isArray(obj)) {
+    for (const item of obj) visitStrings(item, visit)
+  } else if (obj !== null && typeof obj === "object") {
+    for (const item of Object.values(obj)) visitStrings(item, visit)
   }
-  return []
 }
@@ -458,15 +458,16 @@ export class ImportService {
         if (!endNode) return true
         return e.target !== endNode.nodeId
       })
+      const importStamp = Date.now()
       if (lastExisting && repositioned.length > 0) {
         const firstNew = repositioned[0]!
-        mergedEdges.push({ edgeId: `edge_import_${Date.now()}_0`, source: lastExisting.nodeId, target: firstNew.nodeId, label: null })
+        mergedEdges.push({ edgeId: `edge_import_${importStamp}_0`, source: lastExisting.nodeId, target: firstNew.nodeId, label: null })
       }
       for (let i = 0; i < repositioned.length - 1; i++) {
-        mergedEdges.push({ edgeId: `edge_import_${Date.now()}_${i + 1}`, source: repositioned[i]!.nodeId, target: repositioned[i + 1]!.nodeId, label: null })
+        mergedEdges.push({ edgeId: `edge_import_${importStamp}_${i + 1}`, source: repositioned[i]!.nodeId, target: repositioned[i + 1]!.nodeId, label: null })
       }
       if (endNode && lastHttpId) {
-        mergedEdges.push({ edgeId: `edge_import_${Date.now()}_end`, source: lastHttpId, target: endNode.nodeId, label: null })
+        mergedEdges.push({ edgeId: `edge_import_${importStamp}_end`, source: lastHttpId, target: endNode.nodeId, label: null })
       }
 
       const updated = this.workflows.update(opts.workflowId, { nodes: mergedNodes, edges: mergedEdges })
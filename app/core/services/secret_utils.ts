@@ -54,9 +54,12 @@ const SECRET_KEY_PATTERNS: readonly RegExp[] = [
   /[_-]client[_-]secret$/i,
 ]
 
+/** {@link SECRET_KEY_PATTERNS} as one case-insensitive alternation: one scan per key. */
+const SECRET_KEY_RE = anyOf(SECRET_KEY_PATTERNS)
+
 /** True if a dict key name suggests it holds a secret value. */
 export function isSecretKey(key: string): boolean {
-  return SECRET_KEY_PATTERNS.some((pattern) => pattern.test(key))
+  return SECRET_KEY_RE.test(key)
 }
 
 /**
@@ -75,9 +78,20 @@ const SECRET_VALUE_PATTERNS: readonly RegExp[] = [
   /pk_live_/i,
 ]
 
+const SECRET_VALUE_RE = anyOf(SECRET_VALUE_PATTERNS)
+
 /** True if a string value heuristically contains a secret (for import sanitization). */
 export function detectSecretsInValue(value: string): boolean {
-  return SECRET_VALUE_PATTERNS.some((pattern) => pattern.test(value))
+  return SECRET_VALUE_RE.test(value)
+}
+
+/**
+ * Join case-insensitive, non-global patterns into one alternation, so a string
+ * is scanned once instead of once per pattern. Alternation binds loosest, so
+ * each pattern's own `^`/`$` anchors keep their meaning.
+ */
+function anyOf(patterns: readonly RegExp[]): RegExp {
+  return new RegExp(patterns.map((pattern) => `(?:${pattern.source})`).join("|"), "i")
 }
 
 const JWT_PATTERN = /\beyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\b/
@@ -113,6 +127,7 @@ function isRecord(value: unknown): value is Record<string, JsonValue> {
 
 /** Extract secret names from `{{secrets.NAME}}` placeholders in a string. */
 export function extractSecretRefsFromString(value: string): string[] {
+  if (!value.includes("{{")) return []
   const names: string[] = []
   for (const match of value.matchAll(SECRET_REF_RE)) {
     if (match[1] !== undefined) names.push(match[1])
@@ -385,9 +385,8 @@ function getImageSource(contentType: string, bodyText: string): string {
 function getMetricRows(
   response: ApiResponse,
   metadata: NodeResultMetadata | undefined,
-  bodyText: string,
+  responseSizeBytes: number,
 ) {
-  const responseSizeBytes = metadata?.responseSizeBytes ?? byteLength(bodyText);
   const responseTimeMs = metadata?.responseTimeMs ?? response.responseTime;
 
   return [
@@ -435,6 +434,13 @@ export function ResponseInspector({
     () => stringifyBody(response?.body, rawBody),
     [response?.body, rawBody],
   );
+  // Encoding a large body just to count its bytes is not free; only redo it
+  // when the body (or a captured size) changes, not on every render.
+  const capturedSizeBytes = effectiveMetadata?.responseSizeBytes;
+  const responseSizeBytes = useMemo(
+    () => capturedSizeBytes ?? byteLength(bodyText),
+    [capturedSizeBytes, bodyText],
+  );
   const cookieRows = useMemo(() => getCookieRows(response), [response]);
   const filteredHeaders = useMemo(() => {
     if (!response) return [];
@@ -512,7 +518,7 @@ export function ResponseInspector({
 
   const bodyFormat = effectiveMetadata?.bodyFormat;
   const treeData = filterJsonValue(response.body ?? null, filterQuery) ?? null;
-  const metricRows = getMetricRows(response, effectiveMetadata, bodyText);
+  const metricRows = getMetricRows(response, effectiveMetadata, responseSizeBytes);
   const showJsonPreview = isJsonContent(contentType, response.body, bodyFormat);
   const showHtmlPreview = isHtmlContent(contentType, bodyFormat);
   const showImagePreview = isImageContent(contentType, bodyFormat);